@@ -0,0 +1,133 @@
+# PyPaperBot/ArxivResolver.py
+import os
+import re
+import threading
+import arxiv
+from .PapersFilters import similarStrings
+from .Throttle import getRateLimiter
+from .Utils import loadJson, saveJson
+
+CACHE_FILE = os.path.join(os.getcwd(), 'cache', 'arxiv_cache.json')
+ARXIV_ID_RE = re.compile(r'arxiv\.org/(?:abs|pdf)/((?:\d{4}\.\d{4,5}|[a-z\-]+(?:\.[A-Z]{2})?/\d{7}))(?:v\d+)?', re.I)
+
+
+def normalizeTitle(title):
+    return re.sub(r'[\W_]+', '', title.lower()) if title else None
+
+
+def extractArxivId(paper):
+    """Returns the arXiv identifier found in the paper's Scholar or PDF link, if any."""
+    for link in (paper.scholar_link, paper.pdf_link):
+        match = ARXIV_ID_RE.search(link or "")
+        if match:
+            return match.group(1)
+    return None
+
+
+class ArxivResolver:
+    """
+    Resolves arXiv PDF links for many papers with a few API calls, and caches title -> pdf_url on disk.
+    Papers whose Scholar link already points to arXiv are fetched by id (id_list), the others with
+    OR'ed title queries; results are matched back to the papers with similarStrings > 0.8, like
+    the single-title search.
+    """
+    TITLES_PER_QUERY = 10
+    RESULTS_PER_TITLE = 5
+    IDS_PER_QUERY = 100
+    QUERY_TIMEOUT = 60
+
+    def __init__(self, negative_cache=None, cache_file=None):
+        self.negative_cache = negative_cache
+        self.cache_file = cache_file or CACHE_FILE
+        self._lock = threading.Lock()
+        self.cache = loadJson(self.cache_file)
+        self.client = arxiv.Client(page_size=100, delay_seconds=3, num_retries=3)
+
+    def save(self):
+        with self._lock:
+            saveJson(self.cache_file, self.cache)
+
+    def lookup(self, title):
+        """Returns the cached pdf_url for a title, or None if it was never resolved."""
+        with self._lock:
+            return self.cache.get(normalizeTitle(title))
+
+    def remember(self, title, pdf_url):
+        with self._lock:
+            self.cache[normalizeTitle(title)] = pdf_url
+
+    def _run(self, search):
+        """
+        Runs a search with an overall timeout, returning its results or None if it failed.
+        arxiv.Client sends its requests without a timeout, so the search runs in a daemon thread
+        that is abandoned (not waited for) when it hangs.
+        """
+        getRateLimiter().wait("export.arxiv.org")
+        outcome = {}
+
+        def run():
+            try:
+                outcome["results"] = list(self.client.results(search))
+            except Exception as e:
+                outcome["error"] = e
+
+        thread = threading.Thread(target=run, daemon=True, name="arxiv-query")
+        thread.start()
+        thread.join(self.QUERY_TIMEOUT)
+        if thread.is_alive():
+            print(f"    arXiv batch query timed out after {self.QUERY_TIMEOUT} seconds.")
+            return None
+        if "error" in outcome:
+            print(f"    arXiv batch query failed: {outcome['error']}")
+            return None
+        return outcome["results"]
+
+    def prefetch(self, papers):
+        """Resolves every paper not already cached (or known to be missing) in as few queries as possible."""
+        pending = [p for p in papers if p.title and not self.lookup(p.title)
+                   and not (self.negative_cache is not None and self.negative_cache.contains("arXiv", p))]
+        if not pending:
+            return
+        by_id = {}
+        by_title = []
+        for p in pending:
+            arxiv_id = extractArxivId(p)
+            if arxiv_id:
+                by_id[arxiv_id] = p
+            else:
+                by_title.append(p)
+        print(f"Resolving {len(pending)} papers on arXiv in batches...")
+
+        ids = list(by_id)
+        for i in range(0, len(ids), self.IDS_PER_QUERY):
+            chunk = ids[i:i + self.IDS_PER_QUERY]
+            for result in self._run(arxiv.Search(id_list=chunk, max_results=len(chunk))) or []:
+                short_id = re.sub(r'v\d+$', '', result.get_short_id())
+                if short_id in by_id:
+                    self.remember(by_id[short_id].title, result.pdf_url)
+
+        for i in range(0, len(by_title), self.TITLES_PER_QUERY):
+            self._resolveTitles(by_title[i:i + self.TITLES_PER_QUERY])
+
+    def _resolveTitles(self, papers):
+        max_results = len(papers) * self.RESULTS_PER_TITLE
+        query = " OR ".join('ti:"{}"'.format(p.title.replace('"', ' ')) for p in papers)
+        results = self._run(arxiv.Search(query=query, max_results=max_results))
+        if results is None:
+            return
+        unmatched = []
+        for p in papers:
+            best, best_score = None, 0.8
+            for result in results:
+                score = similarStrings(result.title.lower(), p.title.lower(), best_score)
+                if score > best_score:
+                    best, best_score = result, score
+            if best is not None:
+                self.remember(p.title, best.pdf_url)
+            else:
+                unmatched.append(p)
+        # When the query returned fewer results than asked for, every match was seen: the rest are
+        # definitive misses. Otherwise they are left to the single-title search.
+        if len(results) < max_results and self.negative_cache is not None:
+            for p in unmatched:
+                self.negative_cache.add("arXiv", p)
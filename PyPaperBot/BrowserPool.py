@@ -0,0 +1,188 @@
+# PyPaperBot/BrowserPool.py
+import os
+import atexit
+import shutil
+import tempfile
+import threading
+from contextlib import contextmanager
+import undetected_chromedriver as uc
+from selenium.common.exceptions import WebDriverException
+from .NetInfo import NetInfo
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+PROFILE_DIR = os.path.join(os.getcwd(), 'cache', 'chrome_profile')
+
+
+def profileName(chrome_version):
+    return f"chrome{chrome_version}" if chrome_version is not None else "default"
+
+
+def lockProfile(chrome_version, slot):
+    """
+    Returns (profile directory, open lock file) for a browser of the given slot.
+    Chrome cannot share a profile, and other PyPaperBot processes may be using the same slots,
+    so the slot's directory is claimed with an exclusive lock on its '.lock' file; when another
+    browser holds it, the next directories are tried until a free one is found.
+    The lock lasts until the returned file is closed.
+    """
+    base = os.path.join(PROFILE_DIR, profileName(chrome_version))
+    n = slot
+    while True:
+        profile = os.path.join(base, str(n))
+        os.makedirs(profile, exist_ok=True)
+        lock = open(os.path.join(profile, '.lock'), 'a+b')
+        try:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_NBLCK, 1)
+            return profile, lock
+        except OSError:
+            lock.close()
+            n += 1
+
+
+class PooledBrowser:
+    """
+    A warm undetected-chromedriver instance handed out by a BrowserPool.
+    Attribute access is forwarded to the driver, so it can be used wherever a driver is expected;
+    get() also counts the pages served so the pool can recycle the browser.
+    """
+
+    def __init__(self, slot, chrome_version=None):
+        self.slot = slot
+        self.pages = 0
+        self.download_dir = tempfile.mkdtemp()
+        options = uc.ChromeOptions()
+        options.add_argument('--headless')
+        options.add_experimental_option("prefs", {"download.default_directory": self.download_dir})
+        # Network events are read from the performance log to detect when a PDF has arrived
+        options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+        # Each slot of each pool (one pool per Chrome version) keeps its own profile across runs,
+        # locked while this browser uses it
+        profile, self.profile_lock = lockProfile(chrome_version, slot)
+        try:
+            self.driver = uc.Chrome(options=options, user_data_dir=profile, version_main=chrome_version,
+                                    headless=True, use_subprocess=False)
+        except Exception:
+            self.profile_lock.close()
+            shutil.rmtree(self.download_dir, ignore_errors=True)
+            raise
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+    def get(self, url):
+        self.pages += 1
+        return self.driver.get(url)
+
+    def alive(self):
+        try:
+            self.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def quit(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass
+        self.profile_lock.close()
+        shutil.rmtree(self.download_dir, ignore_errors=True)
+
+
+class BrowserPool:
+    """
+    Starts up to 'size' browsers on demand and lends them out with browser().
+    Browsers are kept warm between callers, and replaced after a crash or after serving
+    'max_pages' pages.
+    """
+
+    def __init__(self, size=None, chrome_version=None, max_pages=None):
+        self.size = size or NetInfo.BROWSER_POOL_SIZE
+        self.chrome_version = chrome_version
+        self.max_pages = max_pages or NetInfo.BROWSER_MAX_PAGES
+        self._idle = []
+        self._free_slots = list(range(self.size))
+        self._cond = threading.Condition()
+
+    def _acquire(self):
+        with self._cond:
+            while True:
+                while self._idle:
+                    browser = self._idle.pop()
+                    if browser.alive():
+                        return browser
+                    print("    -> Pooled browser stopped responding, starting a new one...")
+                    self._retire(browser)
+                if self._free_slots:
+                    slot = self._free_slots.pop(0)
+                    break
+                self._cond.wait()
+        try:
+            print("    -> Starting browser...")
+            return PooledBrowser(slot, self.chrome_version)
+        except Exception:
+            with self._cond:
+                self._free_slots.append(slot)
+                self._cond.notify()
+            raise
+
+    def _retire(self, browser):
+        browser.quit()
+        self._free_slots.append(browser.slot)
+
+    @contextmanager
+    def browser(self):
+        """Lends a browser for the 'with' block, starting one if none is idle and the pool is not full."""
+        browser = self._acquire()
+        broken = False
+        try:
+            yield browser
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            with self._cond:
+                if broken or browser.pages >= self.max_pages:
+                    self._retire(browser)
+                else:
+                    self._idle.append(browser)
+                self._cond.notify()
+
+    def shutdown(self):
+        with self._cond:
+            for browser in self._idle:
+                self._retire(browser)
+            self._idle = []
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def getBrowserPool(chrome_version=None):
+    """
+    Returns the pool shared by every caller in this process (one per Chrome version).
+    Without a version, any existing pool is reused so callers share the same warm browsers.
+    """
+    with _pools_lock:
+        if chrome_version is None and _pools:
+            return next(iter(_pools.values()))
+        if chrome_version not in _pools:
+            _pools[chrome_version] = BrowserPool(chrome_version=chrome_version)
+        return _pools[chrome_version]
+
+
+@atexit.register
+def shutdownBrowserPools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.shutdown()
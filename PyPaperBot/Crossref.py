@@ -1,114 +1,191 @@
 # PyPaperBot/Crossref.py
-from crossref_commons.iteration import iterate_publications_as_json
-from crossref_commons.retrieval import get_entity
-from crossref_commons.types import EntityType, OutputType
 from .PapersFilters import similarStrings
-from .Paper import Paper
-from .MetadataFetcher import enrich_paper_with_abstract
-import requests
-import time
-import os
-import json
+from .Paper import Paper, entryToBibtex
+from .MetadataFetcher import enrich_papers_with_abstracts, strip_xml
+from .HttpClient import getHttpClient
+from .MetadataCache import MetadataCache
+from .NetInfo import NetInfo
 import re
-import bibtexparser
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-CACHE_FILE = os.path.join(os.getcwd(), 'cache', 'crossref_metadata_cache.json')
-CACHE_EXPIRATION_SECONDS = 365 * 24 * 60 * 60 # Cache for one year
-
-def normalize_title(title):
-    """Provides a consistent, simplified key for title comparisons."""
-    if not title: return None
-    return re.sub(r'[\W_]+', '', title.lower())
+CROSSREF_API = "https://api.crossref.org"
 
 def load_cache():
-    if os.path.exists(CACHE_FILE):
-        try:
-            with open(CACHE_FILE, 'r') as f: return json.load(f)
-        except (json.JSONDecodeError, IOError): return {}
-    return {}
-
-def save_cache(cache_data):
-    """Saves the provided dictionary to the cache file."""
-    os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
-    with open(CACHE_FILE, 'w') as f: json.dump(cache_data, f, indent=4)
-
-def getBibtex(DOI):
+    return MetadataCache()
+
+def crossrefGet(path, params=None):
+    """GETs a Crossref REST API path through the shared rate-limited session and returns its 'message'."""
+    r = getHttpClient().get(f"{CROSSREF_API}/{path}", params=params)
+    if r.status_code != 200:
+        raise ConnectionError(f"API returned code {r.status_code}")
+    return r.json()["message"]
+
+def searchWorks(title, rows=5):
+    """Returns the Crossref works best matching a title, by relevance."""
+    return crossrefGet("works", {'query.bibliographic': title.lower(), 'sort': 'relevance', 'rows': rows}).get("items", [])
+
+def getWorksByDOIs(DOIs, workers=1):
+    """
+    Fetches the Crossref works of many DOIs with 'filter=doi:...' queries of NetInfo.CROSSREF_DOI_BATCH DOIs,
+    following the result cursor, 'workers' queries at a time. Returns {lower-cased DOI: work};
+    DOIs Crossref does not know are missing. DOIs containing a comma (the filter separator) are fetched one by one.
+    """
+    works = {}
+    batchable = [d.strip() for d in DOIs if d and d.strip() and "," not in d]
+
+    def fetchChunk(chunk):
+        found = []
+        params = {'filter': ",".join("doi:" + d for d in chunk), 'rows': 1000, 'cursor': '*'}
+        while True:
+            message = crossrefGet("works", params)
+            items = message.get("items", [])
+            found.extend(items)
+            if not items or len(items) < params['rows'] or not message.get("next-cursor"):
+                return found
+            params['cursor'] = message["next-cursor"]
+
+    chunks = [batchable[i:i + NetInfo.CROSSREF_DOI_BATCH] for i in range(0, len(batchable), NetInfo.CROSSREF_DOI_BATCH)]
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(chunks)))) as executor:
+        for items in executor.map(fetchChunk, chunks):
+            for work in items:
+                works[work["DOI"].lower()] = work
+    for DOI in DOIs:
+        if DOI and "," in DOI:
+            try:
+                works[DOI.strip().lower()] = crossrefGet(f"works/{DOI.strip()}")
+            except Exception:
+                pass
+    return works
+
+BIBTEX_TYPES = {
+    'journal-article': 'article',
+    'proceedings-article': 'inproceedings',
+    'book-chapter': 'incollection',
+    'book': 'book',
+    'monograph': 'book',
+    'edited-book': 'book',
+    'dissertation': 'phdthesis',
+    'report': 'techreport',
+}
+
+def workToEntry(work):
+    """
+    Converts a Crossref work (the JSON of /works) into a BibTeX entry dict, with the fields of Crossref's
+    /transform/application/x-bibtex output (lower-cased, as bibtexparser reads them), so no second request is needed.
+    """
+    authors = [f"{a['family']}, {a['given']}" if a.get('given') else a['family']
+               for a in work.get('author', []) if a.get('family')]
+    date_parts = (work.get('issued') or work.get('created') or {}).get('date-parts', [[None]])
+    year = date_parts[0][0] if date_parts and date_parts[0] else None
+    surname = re.sub(r'\W+', '', work['author'][0].get('family', '')) if work.get('author') else "Unknown"
+    entry_type = BIBTEX_TYPES.get(work.get('type'), 'misc')
+    container = (work.get('container-title') or [None])[0]
+    fields = {
+        'ENTRYTYPE': entry_type,
+        'ID': f"{surname}_{year}" if year else surname,
+        'title': strip_xml((work.get('title') or [""])[0]),
+        'author': " and ".join(authors),
+        'year': str(year) if year else None,
+        'journal' if entry_type == 'article' else 'booktitle': container,
+        'publisher': work.get('publisher'),
+        'volume': work.get('volume'),
+        'number': work.get('issue'),
+        'pages': work.get('page'),
+        'issn': (work.get('ISSN') or [None])[0],
+        'doi': work.get('DOI'),
+        'url': work.get('URL'),
+    }
+    if work.get('abstract'):
+        fields['abstract'] = strip_xml(work['abstract'])
+    return {k: v for k, v in fields.items() if v}
+
+def workToBibtex(work):
+    """Renders a Crossref work as a BibTeX string (see workToEntry)."""
+    return entryToBibtex(workToEntry(work))
+
+def paperFromWork(DOI, paper_info, restrict=None):
+    """Creates the Paper of a DOI from its Crossref work (or an empty Paper with the DOI if there is none)."""
+    paper_found = Paper()
+    paper_found.DOI = DOI
+    paper_found.crossref_work = paper_info
+    if paper_info and "title" in paper_info: paper_found.title = paper_info["title"][0]
+    if paper_info and "author" in paper_info:
+        authors = [f"{author.get('family', '')}, {author.get('given', '')}".strip() for author in paper_info.get('author', [])]
+        paper_found.authors = "; ".join(authors)
+    if paper_info and "created" in paper_info: paper_found.year = paper_info.get('created', {}).get('date-parts', [[None]])[0][0]
+    if paper_info and (not restrict or restrict != 1):
+        paper_found.setBibtex(workToEntry(paper_info))
+    return paper_found
+
+def applyCachedInfo(p, cache):
+    """Fills the paper from a fresh entry of the MetadataCache with the same title, if there is one. Returns True on a hit."""
+    cached_item = cache.lookup(p.title)
+    if cached_item is None:
+        return False
+    print("    -> Found fresh data in cache.")
+    p.DOI = cached_item.get("DOI")
+    p.authors = cached_item.get("authors")
+    p.bibtex = cached_item.get("bibtex")
+    if p.bibtex: p.setBibtex(p.bibtex)
+    return True
+
+def fetchPaperInfo(p):
+    """
+    Looks a single paper up on Crossref (authors, DOI, BibTeX).
+    The matching search result is the full works record, so it is kept on the paper and
+    the BibTeX and abstract come from it without further Crossref requests.
+    """
     try:
-        url_bibtex = f"https://api.crossref.org/works/{DOI}/transform/application/x-bibtex"
-        x = requests.get(url_bibtex, timeout=15)
-        x.raise_for_status()
-        return str(x.text)
-    except requests.exceptions.RequestException:
-        return ""
-
-def getPapersInfo(papers, s2_api_key):
+        best_match = None
+        highest_similarity = 0.8
+        for el in searchWorks(p.title):
+            if "title" in el:
+                similarity = similarStrings(p.title.lower(), el["title"][0].lower(), highest_similarity)
+                if similarity > highest_similarity:
+                    highest_similarity = similarity
+                    best_match = el
+
+        if best_match:
+            if 'author' in best_match and best_match['author']:
+                author_list = [f"{a.get('family', '')}, {a.get('given', '')}".strip() for a in best_match['author'] if a.get('family')]
+                if author_list: p.authors = "; ".join(author_list)
+            if best_match.get("DOI"):
+                p.DOI = best_match.get("DOI").strip().lower()
+                p.crossref_work = best_match
+                p.setBibtex(workToEntry(best_match))
+        else:
+            print("    -> No confident match found on Crossref.")
+    except Exception as e:
+        print(f"    An unexpected Crossref error occurred: {e}")
+
+def getPapersInfo(papers, s2_api_key, workers=None):
     """
-    Enriches papers with metadata from Crossref.
-    It reads the cache by searching for a matching title, making it robust against key changes.
+    Enriches papers with metadata from Crossref, using the cache when it has a fresh entry,
+    then adds the abstracts the looked up papers are missing (see enrich_papers_with_abstracts).
+    The cache misses are looked up 'workers' (default NetInfo.METADATA_WORKERS) at a time;
+    the papers are updated in place, so the list keeps its order.
     """
     cache = load_cache()
+    fetched = []
     
     for i, p in enumerate(papers):
         print(f"[{i+1}/{len(papers)}] Processing: '{p.title[:40]}...'")
         
-        is_cached = False
-        paper_title_key = normalize_title(p.title)
-        
-        # --- ROBUST CACHE READING LOGIC ---
-        for cached_item in cache.values():
-            # First, try to use the modern 'normalized_title' field
-            cached_title_key = cached_item.get("normalized_title")
-            
-            # If it's not there, fall back to parsing the bibtex from an old cache entry
-            if not cached_title_key and "bibtex" in cached_item:
-                try:
-                    bib_db = bibtexparser.loads(cached_item["bibtex"])
-                    if bib_db.entries:
-                        cached_title_key = normalize_title(bib_db.entries[0].get('title'))
-                except Exception:
-                    continue # Could not parse bibtex, skip this cached item
-            
-            if paper_title_key == cached_title_key:
-                if time.time() - cached_item.get('timestamp', 0) < CACHE_EXPIRATION_SECONDS:
-                    print("    -> Found fresh data in cache.")
-                    p.DOI = cached_item.get("DOI")
-                    p.authors = cached_item.get("authors")
-                    p.bibtex = cached_item.get("bibtex")
-                    if p.bibtex: p.setBibtex(p.bibtex)
-                    is_cached = True
-                    break
-        
-        if is_cached:
+        if applyCachedInfo(p, cache):
             continue
 
         print("    -> No cache hit, querying APIs...")
-        # (The rest of the function remains the same)
-        try:
-            best_match = None
-            highest_similarity = 0.8
-            queries = {'query.bibliographic': p.title.lower(), 'sort': 'relevance'}
-            for el in iterate_publications_as_json(max_results=5, queries=queries):
-                if "title" in el:
-                    similarity = similarStrings(p.title.lower(), el["title"][0].lower())
-                    if similarity > highest_similarity:
-                        highest_similarity = similarity
-                        best_match = el
-            
-            if best_match:
-                if 'author' in best_match and best_match['author']:
-                    author_list = [f"{a.get('family', '')}, {a.get('given', '')}".strip() for a in best_match['author'] if a.get('family')]
-                    if author_list: p.authors = "; ".join(author_list)
-                if best_match.get("DOI"):
-                    p.DOI = best_match.get("DOI").strip().lower()
-                    p.setBibtex(getBibtex(p.DOI))
-            else:
-                print("    -> No confident match found on Crossref.")
-        except Exception as e:
-            print(f"    An unexpected Crossref error occurred: {e}")
-
-        enrich_paper_with_abstract(p, s2_api_key)
-        time.sleep(0.5)
+        fetched.append(p)
 
+    if fetched:
+        print(f"\nLooking up {len(fetched)} papers on Crossref...")
+        with ThreadPoolExecutor(max_workers=workers or NetInfo.METADATA_WORKERS) as executor:
+            futures = {executor.submit(fetchPaperInfo, p): p for p in fetched}
+            for done, future in enumerate(as_completed(futures), 1):
+                p = futures[future]
+                print(f"[{done}/{len(fetched)}] Metadata ready: '{p.title[:40]}...'")
+
+    enrich_papers_with_abstracts(fetched, s2_api_key)
     return papers
 
 def save_papers_to_cache(papers_list):
@@ -120,38 +197,37 @@ def save_papers_to_cache(papers_list):
     if not papers_list:
         return
         
-    cache = load_cache()
-    
-    for p in papers_list:
-        if not p.citekey:
-            print(f"    Warning: Cannot cache paper without a citekey ('{p.title[:30]}...').")
-            continue
-            
-        cache[p.citekey] = {
-            'timestamp': time.time(),
-            'DOI': p.DOI,
-            'authors': p.authors,
-            'bibtex': p.bibtex,
-            'normalized_title': normalize_title(p.title)
-        }
-
-    save_cache(cache)
+    load_cache().update(papers_list)
     print("Cache update complete.")
 
 def getPapersInfoFromDOIs(DOI, restrict):
-    # This function remains unchanged
-    paper_found = Paper()
-    paper_found.DOI = DOI
     try:
-        paper_info = get_entity(DOI, EntityType.PUBLICATION, OutputType.JSON)
-        if paper_info and "title" in paper_info: paper_found.title = paper_info["title"][0]
-        if paper_info and "author" in paper_info:
-            authors = [f"{author.get('family', '')}, {author.get('given', '')}".strip() for author in paper_info.get('author', [])]
-            paper_found.authors = "; ".join(authors)
-        if paper_info and "created" in paper_info: paper_found.year = paper_info.get('created', {}).get('date-parts', [[None]])[0][0]
-        if not restrict or restrict != 1:
-            bibtex_str = getBibtex(paper_found.DOI)
-            if bibtex_str: paper_found.setBibtex(bibtex_str)
+        return paperFromWork(DOI, crossrefGet(f"works/{DOI}"), restrict)
     except Exception as e:
         print(f"Paper not found for DOI {DOI}. Reason: {e}")
-    return paper_found
\ No newline at end of file
+    return paperFromWork(DOI, None)
+
+def getPapersInfoFromDOIList(DOIs, restrict, use_doi_as_filename=False, workers=1):
+    """
+    Creates the Papers of a list of DOIs (in the same order) from batched Crossref queries,
+    so the metadata and BibTeX of many DOIs cost one request. 'workers' batches are queried at a time.
+    """
+    print(f"Searching {len(DOIs)} DOIs on Crossref...")
+    try:
+        works = getWorksByDOIs(DOIs, workers)
+    except Exception as e:
+        print(f"Batched Crossref lookup failed, searching DOIs one by one. Reason: {e}")
+        works = None
+    papers = []
+    for DOI in DOIs:
+        if works is None:
+            p = getPapersInfoFromDOIs(DOI, restrict)
+        else:
+            paper_info = works.get(DOI.strip().lower())
+            if paper_info is None:
+                print(f"Paper not found for DOI {DOI}.")
+            p = paperFromWork(DOI, paper_info, restrict)
+        p.use_doi_as_filename = use_doi_as_filename
+        papers.append(p)
+    print(f"Found {sum(1 for p in papers if p.title)}/{len(DOIs)} DOIs on Crossref.")
+    return papers
\ No newline at end of file
@@ -0,0 +1,126 @@
+# PyPaperBot/HttpClient.py
+import io
+import threading
+import requests
+from urllib.parse import urlsplit, urlunsplit
+from requests.adapters import HTTPAdapter, BaseAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers, select_proxy
+from urllib3.util.retry import Retry
+from .NetInfo import NetInfo
+from .Throttle import ThrottledSession, hostOf
+
+try:
+    import httpx
+    import h2  # noqa: F401 (httpx needs it for HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+def _retry():
+    """Retries connection errors and transient server errors of idempotent requests (429 is left to ThrottledSession)."""
+    return Retry(total=NetInfo.HTTP_RETRIES, connect=NetInfo.HTTP_RETRIES, read=NetInfo.HTTP_RETRIES,
+                 status=NetInfo.HTTP_RETRIES, backoff_factor=0.5, status_forcelist=(500, 502, 504),
+                 allowed_methods=frozenset({"GET", "HEAD"}), raise_on_status=False,
+                 respect_retry_after_header=False)
+
+
+class Http2Adapter(BaseAdapter):
+    """
+    A requests transport adapter backed by an HTTP/2 httpx client, so hosts that support it
+    multiplex all requests over one connection. Bodies are read in full, so it is only mounted
+    for API hosts (NetInfo.HTTP2_HOSTS), never for PDF downloads.
+    Requests that go through a proxy (e.g. --single-proxy, via the environment) or that ask for
+    non-default TLS verification or a client certificate are sent by a regular HTTPAdapter.
+    """
+
+    def __init__(self, fallback=None):
+        super().__init__()
+        self.client = httpx.Client(http2=True, transport=httpx.HTTPTransport(http2=True, retries=NetInfo.HTTP_RETRIES))
+        self.fallback = fallback or HTTPAdapter(max_retries=_retry())
+
+    @staticmethod
+    def _timeout(timeout):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return httpx.Timeout(read, connect=connect)
+        return httpx.Timeout(timeout)
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if select_proxy(request.url, proxies) or verify is not True or cert:
+            return self.fallback.send(request, stream=stream, timeout=timeout, verify=verify, cert=cert, proxies=proxies)
+        try:
+            r = self.client.request(request.method, request.url, headers=dict(request.headers),
+                                    content=request.body, timeout=self._timeout(timeout))
+        except httpx.TimeoutException as e:
+            raise requests.exceptions.Timeout(e, request=request)
+        except httpx.HTTPError as e:
+            raise requests.exceptions.ConnectionError(e, request=request)
+        response = requests.Response()
+        response.status_code = r.status_code
+        response.reason = r.reason_phrase
+        response.headers = CaseInsensitiveDict(r.headers)
+        # httpx already decoded the body: drop the header so it is not decoded twice
+        response.headers.pop("Content-Encoding", None)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = r.content
+        response.raw = io.BytesIO(r.content)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        self.client.close()
+        self.fallback.close()
+
+
+class HttpClient(ThrottledSession):
+    """
+    The HTTP session used by every network module: rate limited per host (see ThrottledSession),
+    with keep-alive connection pools sized per host from NetInfo.HOST_CONCURRENCY, retries of
+    connection errors and 5xx responses, and NetInfo.HTTP_TIMEOUT unless a timeout is given.
+    API hosts in NetInfo.HTTP2_HOSTS use HTTP/2 when httpx and h2 are installed.
+    URLs whose host is in 'base_urls' (default NetInfo.HTTP_BASE_URLS) are sent to that base
+    URL instead, e.g. {"api.crossref.org": "http://127.0.0.1:8000"} to use a local stand-in server.
+    """
+
+    def __init__(self, pool_size=10, http2=True, base_urls=None, limiter=None):
+        super().__init__(limiter)
+        self.base_urls = dict(NetInfo.HTTP_BASE_URLS if base_urls is None else base_urls)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=_retry())
+        self.mount("http://", adapter)
+        self.mount("https://", adapter)
+        for host, limit in NetInfo.HOST_CONCURRENCY.items():
+            size = max(limit, pool_size)
+            self.mount(f"https://{host}/", HTTPAdapter(pool_connections=1, pool_maxsize=size, max_retries=_retry()))
+        if http2 and HTTP2_AVAILABLE:
+            for host in NetInfo.HTTP2_HOSTS:
+                fallback = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=_retry())
+                self.mount(f"https://{host}/", Http2Adapter(fallback))
+
+    def resolve(self, url):
+        """Applies the base URL override of the URL's host, if any."""
+        base = self.base_urls.get(hostOf(url))
+        if not base:
+            return url
+        parts, target = urlsplit(url), urlsplit(base)
+        return urlunsplit((target.scheme, target.netloc, target.path.rstrip("/") + parts.path, parts.query, parts.fragment))
+
+    def request(self, method, url, *args, **kwargs):
+        kwargs.setdefault("timeout", NetInfo.HTTP_TIMEOUT)
+        return super().request(method, self.resolve(url), *args, **kwargs)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def getHttpClient():
+    """Returns the HttpClient shared by the callers that do not manage their own session."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
@@ -0,0 +1,153 @@
+# PyPaperBot/MetadataCache.py
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import bibtexparser
+
+DB_FILE = os.path.join(os.getcwd(), 'cache', 'metadata.sqlite')
+# The JSON cache used before the SQLite store, imported once
+CACHE_FILE = os.path.join(os.getcwd(), 'cache', 'crossref_metadata_cache.json')
+CACHE_EXPIRATION_SECONDS = 365 * 24 * 60 * 60 # Cache for one year
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    citekey TEXT PRIMARY KEY,
+    DOI TEXT,
+    authors TEXT,
+    bibtex TEXT,
+    abstract TEXT,
+    normalized_title TEXT,
+    timestamp REAL
+);
+CREATE INDEX IF NOT EXISTS papers_doi ON papers (lower(DOI));
+CREATE INDEX IF NOT EXISTS papers_title ON papers (normalized_title);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+def normalize_title(title):
+    """Provides a consistent, simplified key for title comparisons."""
+    if not title: return None
+    return re.sub(r'[\W_]+', '', title.lower())
+
+
+def bibtexField(bibtex, field):
+    """Reads a field of a BibTeX string (braced or quoted, nested braces allowed) without a full parse."""
+    match = re.search(r'[\s,]' + field + r'\s*=\s*([{"])', bibtex, re.I)
+    if not match:
+        return None
+    depth, i = 0, match.end(1)
+    opening = match.group(1)
+    for j in range(i, len(bibtex)):
+        c = bibtex[j]
+        if c == "{":
+            depth += 1
+        elif c == "}":
+            if depth == 0:
+                return bibtex[i:j] if opening == "{" else None
+            depth -= 1
+        elif c == '"' and opening == '"' and depth == 0:
+            return bibtex[i:j]
+    return None
+
+
+def bibtexTitle(bibtex):
+    """Returns the normalized title of the first entry of a BibTeX string, or None if it cannot be parsed."""
+    title = bibtexField(bibtex, "title")
+    if title:
+        return normalize_title(title)
+    try:
+        bib_db = bibtexparser.loads(bibtex)
+        if bib_db.entries:
+            return normalize_title(bib_db.entries[0].get('title'))
+    except Exception:
+        pass
+    return None
+
+
+class MetadataCache:
+    """
+    The Crossref metadata cache: one row per citekey with its DOI, authors, BibTeX, abstract,
+    normalized title and timestamp, in a WAL-mode SQLite database indexed by DOI and
+    normalized title. Updates are per-row upserts in one transaction, so concurrent runs
+    (GUI and CLI) add to the cache without overwriting each other. Each thread uses its
+    own connection.
+    The first time, the former crossref_metadata_cache.json is imported (see importJson).
+    """
+
+    def __init__(self, db_path=None, json_file=None):
+        self.db_path = db_path or DB_FILE
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        conn = self._connection()
+        with conn:
+            conn.executescript(SCHEMA)
+        if conn.execute("SELECT value FROM meta WHERE key = 'json_imported'").fetchone() is None:
+            json_file = json_file or CACHE_FILE
+            if os.path.exists(json_file):
+                self.importJson(json_file)
+            with conn:
+                conn.execute("INSERT OR REPLACE INTO meta VALUES ('json_imported', ?)", (json_file,))
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _upsert(self, rows):
+        conn = self._connection()
+        with conn:
+            # Upserts keep the row (and its rowid) of an existing citekey, so older entries stay first
+            conn.executemany(
+                "INSERT INTO papers (citekey, DOI, authors, bibtex, abstract, normalized_title, timestamp) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(citekey) DO UPDATE SET DOI = excluded.DOI, "
+                "authors = excluded.authors, bibtex = excluded.bibtex, abstract = excluded.abstract, "
+                "normalized_title = excluded.normalized_title, timestamp = excluded.timestamp", rows)
+
+    def importJson(self, json_file):
+        """Imports a crossref_metadata_cache.json, adding the normalized title of legacy entries from their BibTeX."""
+        try:
+            with open(json_file, 'r') as f: entries = json.load(f)
+        except (json.JSONDecodeError, IOError): return
+        print(f"Importing the metadata cache {json_file} into {self.db_path}...")
+        rows = []
+        for citekey, entry in entries.items():
+            bibtex = entry.get("bibtex")
+            title = entry.get("normalized_title") or (bibtexTitle(bibtex) if bibtex else None)
+            rows.append((citekey, entry.get("DOI"), entry.get("authors"), bibtex,
+                         bibtexField(bibtex, "abstract") if bibtex else None, title, entry.get("timestamp", 0)))
+        self._upsert(rows)
+        print(f"    {len(rows)} entries imported.")
+
+    def lookup(self, title=None, DOI=None):
+        """Returns a fresh entry (as a dict) with this DOI or, failing that, this title; None if there is none."""
+        conn = self._connection()
+        oldest = time.time() - CACHE_EXPIRATION_SECONDS
+        row = None
+        if DOI:
+            row = conn.execute("SELECT * FROM papers WHERE lower(DOI) = ? AND timestamp > ? ORDER BY rowid LIMIT 1",
+                               (DOI.strip().lower(), oldest)).fetchone()
+        if row is None and title:
+            row = conn.execute("SELECT * FROM papers WHERE normalized_title = ? AND timestamp > ? ORDER BY rowid LIMIT 1",
+                               (normalize_title(title), oldest)).fetchone()
+        return dict(row) if row is not None else None
+
+    def update(self, papers):
+        """Stores papers under their citekey (papers without one are skipped)."""
+        rows = []
+        for p in papers:
+            if not p.citekey:
+                print(f"    Warning: Cannot cache paper without a citekey ('{p.title[:30]}...').")
+                continue
+            rows.append((p.citekey, p.DOI, p.authors, p.bibtex,
+                         bibtexField(p.bibtex, "abstract") if p.bibtex else None,
+                         normalize_title(p.title), time.time()))
+        self._upsert(rows)
@@ -1,20 +1,71 @@
 # PyPaperBot/MetadataFetcher.py
-import requests
+from .HttpClient import getHttpClient
+from .NetInfo import NetInfo
 import re
 import html
-import bibtexparser
 
 def strip_xml(text: str) -> str:
     text = re.sub(r"<[^>]+>", "", text)
     return html.unescape(text).strip()
 
+S2_API = "https://api.semanticscholar.org/graph/v1"
+
+def has_abstract(paper):
+    return bool(paper.bibtex) and 'abstract =' in paper.bibtex.lower()
+
+def fetch_s2_abstracts(DOIs, s2_api_key):
+    """
+    Looks the abstracts of many DOIs up with Semantic Scholar's POST /paper/batch, NetInfo.S2_BATCH_SIZE
+    IDs per request. Returns {lower-cased DOI: abstract} for the DOIs that have one.
+    """
+    abstracts = {}
+    for i in range(0, len(DOIs), NetInfo.S2_BATCH_SIZE):
+        chunk = DOIs[i:i + NetInfo.S2_BATCH_SIZE]
+        try:
+            r = getHttpClient().post(
+                f"{S2_API}/paper/batch",
+                params={"fields": "abstract"},
+                json={"ids": [f"DOI:{doi}" for doi in chunk]},
+                headers={"x-api-key": s2_api_key},
+                timeout=(10, 60)
+            )
+            if r.status_code != 200:
+                print(f"    Warning: Semantic Scholar batch lookup returned status {r.status_code}.")
+                continue
+            # One result per requested ID, in order; null for IDs Semantic Scholar does not know
+            for doi, js in zip(chunk, r.json()):
+                abstract_txt = ((js or {}).get("abstract") or "").strip()
+                if abstract_txt:
+                    abstracts[doi.lower()] = abstract_txt
+        except Exception as e:
+            print(f"    Warning: Semantic Scholar batch lookup failed. Reason: {e}")
+    return abstracts
+
+def enrich_papers_with_abstracts(papers, s2_api_key=None):
+    """
+    Adds the missing abstracts of many papers: the DOIs are looked up on Semantic Scholar in a
+    few batch requests, and only the papers it has no abstract for fall back to Crossref.
+    """
+    missing = [p for p in papers if not has_abstract(p)]
+    if not missing:
+        return papers
+    abstracts = {}
+    DOIs = list(dict.fromkeys(p.DOI for p in missing if p.DOI))
+    if s2_api_key and DOIs:
+        print(f"Searching {len(DOIs)} abstracts on Semantic Scholar...")
+        abstracts = fetch_s2_abstracts(DOIs, s2_api_key)
+        print(f"    {len(abstracts)}/{len(DOIs)} abstracts found on Semantic Scholar.")
+    for p in missing:
+        enrich_paper_with_abstract(p, force_s2_abstract=abstracts.get(p.DOI.lower()) if p.DOI else None)
+    return papers
+
 def enrich_paper_with_abstract(paper, s2_api_key=None, force_s2_abstract=None):
     """
     Enriches a Paper object's bibtex with an abstract if it's missing.
-    Tries Semantic Scholar first, then Crossref's JSON API.
+    Tries Semantic Scholar first, then Crossref's JSON API (the paper's crossref_work if it was already fetched).
     Can be forced to use a pre-fetched S2 abstract.
     """
-    if paper.bibtex and 'abstract =' in paper.bibtex.lower():
+    if has_abstract(paper):
         return # Already has an abstract
 
     print(f"    -> Abstract missing for '{paper.title[:30]}...'. Searching...")
@@ -24,10 +75,10 @@ def enrich_paper_with_abstract(paper, s2_api_key=None, force_s2_abstract=None):
     if not abstract_txt and s2_api_key and paper.DOI:
         try:
             headers = {"x-api-key": s2_api_key}
-            s2 = requests.get(
-                f"https://api.semanticscholar.org/graph/v1/paper/DOI:{paper.DOI}",
+            s2 = getHttpClient().get(
+                f"{S2_API}/paper/DOI:{paper.DOI}",
                 params={"fields": "abstract"},
-                headers=headers, timeout=10
+                headers=headers
             )
             if s2.status_code == 200:
                 js = s2.json()
@@ -39,8 +90,11 @@ def enrich_paper_with_abstract(paper, s2_api_key=None, force_s2_abstract=None):
     # Strategy 2: Crossref JSON API Fallback
     if not abstract_txt and paper.DOI:
         try:
-            cr = requests.get(f"https://api.crossref.org/works/{paper.DOI}", timeout=10).json()
-            raw_abs = cr["message"].get("abstract")
+            work = getattr(paper, "crossref_work", None)
+            if work is None:
+                work = getHttpClient().get(f"https://api.crossref.org/works/{paper.DOI}").json()["message"]
+                paper.crossref_work = work
+            raw_abs = work.get("abstract")
             if raw_abs:
                 abstract_txt = strip_xml(raw_abs)
                 if abstract_txt: print("        Found abstract on Crossref.")
@@ -51,17 +105,12 @@ def enrich_paper_with_abstract(paper, s2_api_key=None, force_s2_abstract=None):
         try:
             # If bibtex doesn't exist, create a minimal one
             if not paper.bibtex:
-                db = bibtexparser.bibdatabase.BibDatabase()
-                db.entries = [{'ENTRYTYPE': 'article', 'ID': 'temp', 'title': paper.title or 'No Title'}]
-                paper.bibtex = bibtexparser.dumps(db)
+                paper.setBibEntry({'ENTRYTYPE': 'article', 'ID': 'temp', 'title': paper.title or 'No Title'})
 
-            parser = bibtexparser.bparser.BibTexParser(common_strings=True)
-            bib_database = bibtexparser.loads(paper.bibtex, parser=parser)
-            if bib_database.entries:
-                bib_database.entries[0]['abstract'] = abstract_txt
-                writer = bibtexparser.bwriter.BibTexWriter()
-                writer.indent = '    '
-                paper.bibtex = writer.write(bib_database)
+            entry = paper.bibEntry
+            if entry:
+                entry['abstract'] = abstract_txt
+                paper.setBibEntry(entry)
                 print("        Successfully added abstract to BibTeX entry.")
         except Exception as e:
             print(f"        Warning: Failed to inject abstract into BibTeX. Reason: {e}")
\ No newline at end of file
@@ -0,0 +1,131 @@
+# PyPaperBot/MirrorHealth.py
+import os
+import time
+import threading
+import requests
+from urllib.parse import urljoin
+from concurrent.futures import ThreadPoolExecutor
+from .NetInfo import NetInfo
+from .Utils import loadJson, saveJson
+
+HEALTH_FILE = os.path.join(os.getcwd(), 'cache', 'mirror_health.json')
+
+# kind -> (mirror list attribute, text a working mirror's home page contains, NetInfo attribute holding the current mirror)
+MIRROR_KINDS = {
+    "scihub": ("SciHub_MIRRORS", "Sci-Hub", "SciHub_URL"),
+    "scidb": ("SciDB_MIRRORS", "Anna", "SciDB_URL"),
+}
+
+_mirror_sets = {}
+_file_lock = threading.Lock()
+
+
+def probeMirror(session, url, marker, timeout=10):
+    """Requests the mirror's home page and returns {'url', 'ok', 'latency'}."""
+    start = time.monotonic()
+    try:
+        r = session.get(urljoin(url, "/"), headers=NetInfo.HEADERS, timeout=timeout, verify=False)
+        ok = r.status_code == 200 and marker in r.text
+    except requests.exceptions.RequestException:
+        ok = False
+    return {"url": url, "ok": ok, "latency": round(time.monotonic() - start, 3)}
+
+
+def probeMirrors(session, urls, marker):
+    """Probes all mirrors at the same time and returns them ranked: working ones first, fastest first."""
+    with ThreadPoolExecutor(max_workers=max(1, len(urls))) as executor:
+        results = list(executor.map(lambda url: probeMirror(session, url, marker), urls))
+    return sorted(results, key=lambda m: (not m["ok"], m["latency"]))
+
+
+def loadHealth():
+    return loadJson(HEALTH_FILE)
+
+
+def saveHealth(kind, ranking):
+    with _file_lock:
+        health = loadHealth()
+        health[kind] = {"timestamp": time.time(), "mirrors": ranking}
+        saveJson(HEALTH_FILE, health)
+
+
+class MirrorSet:
+    """
+    The ranked mirrors of one kind. The best one is published in NetInfo (SciHub_URL or SciDB_URL);
+    after NetInfo.MIRROR_MAX_FAILURES consecutive failures it is marked down and the next
+    working mirror takes over. A pinned mirror (given by the user) never fails over.
+    """
+
+    def __init__(self, kind, ranking, pinned=False):
+        self.kind = kind
+        self.ranking = ranking
+        self.pinned = pinned
+        self.failures = 0
+        self._lock = threading.Lock()
+        working = [m for m in ranking if m["ok"]] or ranking
+        self.current = working[0]["url"]
+        setattr(NetInfo, MIRROR_KINDS[kind][2], self.current)
+
+    def owns(self, url):
+        return any(url.startswith(m["url"]) for m in self.ranking)
+
+    def report(self, url, ok):
+        """Records whether a request to a mirror worked; fails over when the current mirror degrades."""
+        with self._lock:
+            if not url.startswith(self.current):
+                return
+            if ok:
+                self.failures = 0
+                return
+            self.failures += 1
+            if self.pinned or self.failures < NetInfo.MIRROR_MAX_FAILURES:
+                return
+            for m in self.ranking:
+                if m["url"] == self.current:
+                    m["ok"] = False
+            remaining = [m for m in self.ranking if m["ok"]]
+            if not remaining:
+                return
+            print(f"    -> Mirror {self.current} keeps failing, switching to {remaining[0]['url']}")
+            self.current = remaining[0]["url"]
+            self.failures = 0
+            setattr(NetInfo, MIRROR_KINDS[self.kind][2], self.current)
+        saveHealth(self.kind, self.ranking)
+
+
+def selectMirror(session, kind, pinned_url=None, force=False):
+    """
+    Picks the mirror to use for 'kind' ('scihub' or 'scidb').
+    A ranking saved less than NetInfo.MIRROR_HEALTH_TTL seconds ago is reused without probing.
+    """
+    if pinned_url:
+        _mirror_sets[kind] = MirrorSet(kind, [{"url": pinned_url, "ok": True, "latency": 0}], pinned=True)
+        return pinned_url
+    existing = _mirror_sets.get(kind)
+    if existing is not None and not existing.pinned and not force:
+        return existing.current
+
+    mirrors_attr, marker, _ = MIRROR_KINDS[kind]
+    urls = getattr(NetInfo, mirrors_attr)
+    saved = loadHealth().get(kind)
+    if (not force and saved and time.time() - saved.get("timestamp", 0) < NetInfo.MIRROR_HEALTH_TTL
+            and {m["url"] for m in saved.get("mirrors", [])} == set(urls)):
+        ranking = saved["mirrors"]
+    else:
+        print(f"Probing {len(urls)} {marker} mirrors...")
+        ranking = probeMirrors(session, urls, marker)
+        saveHealth(kind, ranking)
+    mirror_set = MirrorSet(kind, ranking)
+    _mirror_sets[kind] = mirror_set
+    if any(m["ok"] for m in ranking):
+        print(f"Using {marker} mirror: {mirror_set.current}")
+    else:
+        print(f"No working {marker} mirror found, falling back to {mirror_set.current}")
+    return mirror_set.current
+
+
+def reportMirror(url, ok):
+    """Reports the outcome of a request to whichever mirror set 'url' belongs to (ignored for other URLs)."""
+    for mirror_set in list(_mirror_sets.values()):
+        if mirror_set.owns(url):
+            mirror_set.report(url, ok)
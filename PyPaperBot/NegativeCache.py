@@ -0,0 +1,73 @@
+# PyPaperBot/NegativeCache.py
+import os
+import re
+import time
+import threading
+from .NetInfo import NetInfo
+from .Utils import loadJson, saveJson
+
+CACHE_FILE = os.path.join(os.getcwd(), 'cache', 'negative_cache.json')
+DAY = 24 * 60 * 60
+
+
+def paperKey(paper):
+    """Identifies a paper by DOI, or by its normalized title when it has none."""
+    if paper.DOI:
+        return "doi:" + paper.DOI.strip().lower()
+    if paper.title:
+        return "title:" + re.sub(r'[\W_]+', '', paper.title.lower())
+    return None
+
+
+class NegativeCache:
+    """
+    Remembers which sources recently had nothing for a paper ("no OA URL", "no arXiv match",
+    "no SciDB link"), keyed by (source, DOI or normalized title) and persisted across runs.
+    Entries expire after the source's TTL in NetInfo.NEGATIVE_CACHE_TTL_DAYS.
+    Only definitive misses are recorded; timeouts and network errors are not.
+    With enabled=False entries are still recorded but never used to skip a source.
+    """
+
+    def __init__(self, cache_file=None, enabled=True):
+        self.cache_file = cache_file or CACHE_FILE
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.entries = self._load()
+
+    def _load(self):
+        entries = loadJson(self.cache_file)
+        now = time.time()
+        try:
+            # Expired entries are dropped on load so the file does not grow forever
+            return {source: {k: t for k, t in keys.items() if now - t < self._ttl(source)}
+                    for source, keys in entries.items()}
+        except AttributeError:
+            return {}
+
+    def save(self):
+        with self._lock:
+            saveJson(self.cache_file, self.entries, indent=None)
+
+    @staticmethod
+    def _ttl(source):
+        return NetInfo.NEGATIVE_CACHE_TTL_DAYS.get(source, NetInfo.NEGATIVE_CACHE_DEFAULT_TTL_DAYS) * DAY
+
+    def contains(self, source, paper):
+        """True if 'source' had nothing for this paper within its TTL."""
+        key = paperKey(paper)
+        if not self.enabled or key is None:
+            return False
+        with self._lock:
+            timestamp = self.entries.get(source, {}).get(key)
+        return timestamp is not None and time.time() - timestamp < self._ttl(source)
+
+    def add(self, source, paper):
+        key = paperKey(paper)
+        if key is not None:
+            with self._lock:
+                self.entries.setdefault(source, {})[key] = time.time()
+
+    def discard(self, source, paper):
+        key = paperKey(paper)
+        with self._lock:
+            self.entries.get(source, {}).pop(key, None)
@@ -2,6 +2,12 @@
 class NetInfo:
     SciHub_URL = None
     SciDB_URL = "https://annas-archive.org/scidb/"
+    # Mirrors probed by MirrorHealth; the ranking is kept for MIRROR_HEALTH_TTL seconds
+    SciHub_MIRRORS = ["https://sci-hub.ee/", "https://sci-hub.now.sh/", "https://sci-hub.st/", "https://sci-hub.se/", "https://sci-hub.ru/"]
+    SciDB_MIRRORS = ["https://annas-archive.org/scidb/", "https://annas-archive.se/scidb/", "https://annas-archive.li/scidb/"]
+    MIRROR_HEALTH_TTL = 6 * 60 * 60
+    # Consecutive failed requests after which the current mirror is replaced by the next best one
+    MIRROR_MAX_FAILURES = 3
     # More comprehensive headers to mimic a real browser
     HEADERS = {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/108.0.0.0 Safari/537.36',
@@ -17,4 +23,70 @@ class NetInfo:
         'DNT': '1'
     }
     SciHub_URLs_repo = "https://sci-hub.41610.org/" # This is now a fallback
-    gemini_api_key = None
\ No newline at end of file
+    gemini_api_key = None
+    # Maximum number of concurrent requests per host when downloading with several workers
+    DEFAULT_HOST_CONCURRENCY = 4
+    HOST_CONCURRENCY = {
+        "doi.org": 4,
+        "api.unpaywall.org": 2,
+        "export.arxiv.org": 1,
+        "arxiv.org": 2,
+        "annas-archive.org": 2,
+        "annas-archive.se": 2,
+        "annas-archive.li": 2,
+    }
+    # Request rate budgets per host: (requests per second, burst). Hosts not listed are not rate limited
+    HOST_RATE_LIMITS = {
+        "api.crossref.org": (10, 5),
+        "api.semanticscholar.org": (1, 1),
+        "export.arxiv.org": (1 / 3, 1),
+        "api.unpaywall.org": (10, 5),
+        "annas-archive.org": (2, 2),
+        "annas-archive.se": (2, 2),
+        "annas-archive.li": (2, 2),
+        "scholar.google.com": (0.2, 1),
+    }
+    # Retries of a request answered with 429, the backoff when no Retry-After is given, and the longest wait accepted
+    RATE_LIMIT_RETRIES = 3
+    RATE_LIMIT_BACKOFF = 5
+    MAX_RETRY_AFTER = 120
+    # Default (connect, read) timeout in seconds and retries of connection errors and 5xx responses for every request
+    HTTP_TIMEOUT = (10, 30)
+    HTTP_RETRIES = 2
+    # API hosts requested over HTTP/2 when httpx and h2 are installed
+    HTTP2_HOSTS = ["api.crossref.org", "api.semanticscholar.org", "api.unpaywall.org"]
+    # Host -> base URL to send its requests to instead (e.g. a local stand-in server for tests)
+    HTTP_BASE_URLS = {}
+    # DOIs per Crossref 'filter=doi:...' query when resolving a DOI list
+    CROSSREF_DOI_BATCH = 50
+    # Papers looked up on Crossref at the same time by getPapersInfo (requests still follow HOST_RATE_LIMITS)
+    METADATA_WORKERS = 5
+    # IDs per Semantic Scholar /paper/batch request (the API maximum is 500)
+    S2_BATCH_SIZE = 500
+    # E-mail sent with Unpaywall API requests (None: $UNPAYWALL_EMAIL), and days a cached answer is reused
+    UNPAYWALL_EMAIL = None
+    UNPAYWALL_CACHE_TTL_DAYS = 90
+    # SQLite index built from an Unpaywall snapshot with --ingest-unpaywall (None: cache/unpaywall_snapshot.sqlite)
+    UNPAYWALL_SNAPSHOT_DB = None
+    # Network calls run at the same time by each phase with --async (Scholar pages, DOI batches, downloads)
+    ASYNC_CONCURRENCY = 64
+    # Seconds a source that found a PDF waits for higher-priority sources in the "race" download strategy
+    RACE_TIE_WINDOW = 0.25
+    # Downloads larger than this many bytes are aborted
+    MAX_PDF_SIZE = 200 * 1024 * 1024
+    # Seconds the Sci-Hub browser waits for the article page and for the PDF, and how often it checks
+    BROWSER_PAGE_TIMEOUT = 15
+    BROWSER_DOWNLOAD_TIMEOUT = 60
+    BROWSER_POLL_INTERVAL = 0.25
+    # Number of Chrome instances kept warm by the browser pool, and pages each serves before it is restarted
+    BROWSER_POOL_SIZE = 1
+    BROWSER_MAX_PAGES = 100
+    # Days a source is skipped for a paper after it definitely had nothing for it
+    NEGATIVE_CACHE_DEFAULT_TTL_DAYS = 7
+    NEGATIVE_CACHE_TTL_DAYS = {
+        "Unpaywall": 14,
+        "arXiv": 30,
+        "Anna's Archive": 7,
+    }
+    # Directory of the content-addressed PDF library shared by all runs (None: cache/library)
+    PDF_LIBRARY_DIR = None
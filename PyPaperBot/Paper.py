@@ -4,6 +4,35 @@ import re
 import pandas as pd
 import urllib.parse
 
+BIBTEX_INDENT = '    '
+
+def parseBibtex(bibtex):
+    """Parses a BibTeX string and returns its first entry as a dict (None if it has no entry)."""
+    parser = bibtexparser.bparser.BibTexParser(common_strings=True)
+    entries = bibtexparser.loads(bibtex, parser=parser).entries
+    return entries[0] if entries else None
+
+def entryToBibtex(entry):
+    """
+    Writes a BibTeX entry dict with the exact output of bibtexparser's BibTexWriter (indent '    ',
+    fields in alphabetical order) without building a BibDatabase.
+    """
+    fields = sorted(f for f in entry if f not in ('ENTRYTYPE', 'ID'))
+    if not all(isinstance(entry[f], str) for f in fields):
+        # String expressions (@string macros) are left to bibtexparser
+        db = bibtexparser.bibdatabase.BibDatabase()
+        db.entries = [entry]
+        writer = bibtexparser.bwriter.BibTexWriter()
+        writer.indent = BIBTEX_INDENT
+        return writer.write(db)
+    body = "".join(f",\n{BIBTEX_INDENT}{f} = {{{entry[f]}}}" for f in fields)
+    return f"@{entry['ENTRYTYPE']}{{{entry['ID']}{body}\n}}\n"
+
+def writeBibtex(entries):
+    """Writes entries like BibTexWriter does: sorted by ID and separated by a blank line."""
+    entries = sorted(entries, key=lambda e: str(e.get('ID', '')).lower())
+    return "\n".join(entryToBibtex(e) for e in entries)
+
 class Paper:
     def __init__(self,title=None, scholar_link=None, scholar_page=None, cites=None, link_pdf=None, year=None, authors=None):        
         self.title = title
@@ -15,9 +44,11 @@ class Paper:
 
         self.jurnal = None
         self.cites_num = cites
-        self.bibtex = None
+        self._bibtex = None
+        self._bib_entry = None
         self.DOI = None
         self.citekey = None # For custom citation key
+        self.crossref_work = None # The Crossref works record, once looked up
 
         self.downloaded = False
         self.downloadedFrom = 0
@@ -35,14 +66,47 @@ class Paper:
         except:
             return "none.pdf"
 
+    @property
+    def bibtex(self):
+        """The BibTeX string of the paper, written from bibEntry when the entry was changed."""
+        if self._bibtex is None and self._bib_entry:
+            self._bibtex = entryToBibtex(self._bib_entry)
+        return self._bibtex
+
+    @bibtex.setter
+    def bibtex(self, bibtex):
+        self._bibtex = bibtex
+        self._bib_entry = None
+
+    @property
+    def bibEntry(self):
+        """
+        The parsed BibTeX entry (a bibtexparser entry dict), the source of truth once set.
+        A BibTeX string is parsed at most once; None if there is no BibTeX or it cannot be parsed.
+        """
+        if self._bib_entry is None and self._bibtex:
+            try:
+                self._bib_entry = parseBibtex(self._bibtex) or False
+            except Exception:
+                self._bib_entry = False
+        return self._bib_entry or None
+
+    def setBibEntry(self, entry):
+        """Replaces the BibTeX with an entry dict (or marks an entry from bibEntry as changed); the string is written lazily."""
+        self._bib_entry = entry
+        self._bibtex = None
+
     def setBibtex(self, bibtex):
+        """Sets the BibTeX (a string, or an entry dict) and takes the year, authors and journal from it."""
         try:
-            parser = bibtexparser.bparser.BibTexParser(common_strings=True)
-            x = bibtexparser.loads(bibtex, parser=parser).entries
-            if not x: return
-            
-            self.bibtex = bibtex
-            entry = x[0]
+            if isinstance(bibtex, dict):
+                entry = bibtex
+                self.setBibEntry(entry)
+            else:
+                entry = parseBibtex(bibtex)
+                if entry is None: return
+                self.bibtex = bibtex
+                self._bib_entry = entry
 
             if "year" in entry: self.year = entry["year"]
             if 'author' in entry: self.authors = entry["author"]
@@ -128,25 +192,15 @@ def generate_custom_bibtex(papers, path):
     
     for p in papers:
         if p.bibtex:
-            try:
-                parser = bibtexparser.bparser.BibTexParser(common_strings=True)
-                bib_database = bibtexparser.loads(p.bibtex, parser=parser)
-                if bib_database.entries:
-                    entry = bib_database.entries[0]
-                    # Set the new, robust citekey
-                    entry['ID'] = p.citekey if p.citekey else entry['ID']
-                    all_bib_entries.append(entry)
-            except Exception as e:
-                print(f"    Warning: Could not parse bibtex for bibkey generation '{p.title}'. Reason: {e}")
+            entry = p.bibEntry
+            if entry is None:
+                print(f"    Warning: Could not parse bibtex for bibkey generation '{p.title}'.")
                 continue
+            # Set the new, robust citekey (on a copy, the paper keeps its entry)
+            all_bib_entries.append(dict(entry, ID=p.citekey if p.citekey else entry['ID']))
     
     if all_bib_entries:
-        final_db = bibtexparser.bibdatabase.BibDatabase()
-        final_db.entries = all_bib_entries
-        
-        writer = bibtexparser.bwriter.BibTexWriter()
-        writer.indent = '    '
         with open(path, 'w', encoding='utf-8') as bibfile:
-            bibfile.write(writer.write(final_db))
+            bibfile.write(writeBibtex(all_bib_entries))
 
     print("BibTeX file generation complete.")
\ No newline at end of file
@@ -4,12 +4,93 @@ Created on Tue Aug 18 12:41:29 2020
 
 @author: Vito
 """
+import numpy as np
 import pandas as pd
 from difflib import SequenceMatcher
 
+try:
+    from rapidfuzz import fuzz
+except ImportError:
+    fuzz = None
 
-def similarStrings(a, b):
-    return SequenceMatcher(None, a, b).ratio()
+
+"""
+Input
+    a, b: strings to compare
+    threshold: if given, pairs that cannot reach it return 0.0 without computing the full ratio
+Output
+    result: SequenceMatcher ratio of a and b (exact whenever it is >= threshold)
+"""
+def similarStrings(a, b, threshold=None):
+    matcher = SequenceMatcher(None, a, b)
+    # real_quick_ratio and quick_ratio are upper bounds of ratio, computed in linear time
+    if threshold is not None and (matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold):
+        return 0.0
+    return matcher.ratio()
+
+
+"""
+Matches names against a fixed list (e.g. the journals of a filter csv) with the same result as
+comparing every pair with similarStrings(name, candidate) >= threshold, without doing so.
+The list is indexed once: lengths and character counts of every candidate in NumPy arrays.
+For a name, two upper bounds of the SequenceMatcher ratio discard most candidates at once:
+    - the length bound 2*min(len) / (len(name) + len(candidate))
+    - the character bound 2*(common characters) / (len(name) + len(candidate)), i.e. quick_ratio
+The remaining ones are checked with rapidfuzz's ratio (also an upper bound) when it is
+installed, and confirmed with SequenceMatcher, best bound first.
+"""
+class StringMatcher:
+
+    def __init__(self, candidates, threshold=0.8):
+        self.threshold = threshold
+        self.candidates = list(dict.fromkeys(candidates))
+        self.lengths = np.array([len(c) for c in self.candidates], dtype=np.int64)
+        # Every character of every candidate as a code point, and the candidate it belongs to
+        codes = np.frombuffer("".join(self.candidates).encode("utf-32-le"), dtype=np.uint32)
+        rows = np.repeat(np.arange(len(self.candidates)), self.lengths)
+        chars, columns = np.unique(codes, return_inverse=True)
+        self.alphabet = {chr(c): i for i, c in enumerate(chars)}
+        self.histograms = np.zeros((len(self.candidates), max(1, len(chars))), dtype=np.int32)
+        np.add.at(self.histograms, (rows, columns), 1)
+
+    def _bounds(self, name):
+        """Indices of the candidates whose ratio upper bound reaches the threshold, with the bounds."""
+        totals = self.lengths + len(name)
+        bounds = 2.0 * np.minimum(self.lengths, len(name)) / np.maximum(totals, 1)
+        bounds[totals == 0] = 1.0
+        selected = np.nonzero(bounds >= self.threshold)[0]
+        if len(selected) == 0 or len(name) == 0:
+            return selected, bounds[selected]
+        name_counts = {}
+        for char in name:
+            name_counts[char] = name_counts.get(char, 0) + 1
+        columns = [self.alphabet[c] for c in name_counts if c in self.alphabet]
+        if columns:
+            common = np.minimum(self.histograms[np.ix_(selected, columns)],
+                                np.array([name_counts[c] for c in name_counts if c in self.alphabet])).sum(axis=1)
+        else:
+            common = np.zeros(len(selected), dtype=np.int64)
+        # The same division as difflib, so the bound is never below the float ratio
+        bounds = 2.0 * common / totals[selected]
+        keep = bounds >= self.threshold
+        return selected[keep], bounds[keep]
+
+    def _matching(self, name):
+        selected, bounds = self._bounds(name)
+        for i in selected[np.argsort(-bounds, kind="stable")]:
+            candidate = self.candidates[i]
+            if fuzz is not None and fuzz.ratio(name, candidate) < self.threshold * 100 - 1e-6:
+                continue
+            if similarStrings(name, candidate) >= self.threshold:
+                yield candidate
+
+    def matches(self, name):
+        """The candidates with similarStrings(name, candidate) >= threshold, best bound first."""
+        return list(self._matching(name))
+
+    def hasMatch(self, name):
+        """True if some candidate has similarStrings(name, candidate) >= threshold."""
+        return next(self._matching(name), None) is not None
 
 
 """
@@ -24,13 +105,16 @@ def filterJurnals(papers,csv_path):
     df = pd.read_csv(csv_path, sep=";")
     journal_list = list(df["journal_list"])
     include_list = list(df["include_list"])
+    matcher = StringMatcher([jurnal for jurnal, include in zip(journal_list, include_list)
+                             if include == 1 and isinstance(jurnal, str)], 0.8)
+    matched = {}
 
     for p in papers:
         good = not (p.jurnal is not None and len(p.jurnal) > 0)
-        if p.jurnal is not None:
-            for jurnal, include in zip(journal_list, include_list):
-                if include == 1 and similarStrings(p.jurnal, jurnal) >= 0.8:
-                    good = True
+        if not good:
+            if p.jurnal not in matched:
+                matched[p.jurnal] = matcher.hasMatch(p.jurnal)
+            good = matched[p.jurnal]
 
         if good:
             result.append(p)
@@ -53,3 +137,27 @@ def filter_min_date(list_papers,min_year):
             new_list.append(paper)
 
     return new_list
+
+
+"""
+Input
+    to_download: list of Paper
+    filter_jurnal_file: csv of the journals to include (see filterJurnals), or None
+    min_date: minimal publication year accepted, or None
+    num_limit_type: 0 to sort by year, 1 to sort by number of citations (most recent/cited first)
+Output
+    result: the filtered and sorted list of Paper
+"""
+def selectPapers(to_download, filter_jurnal_file=None, min_date=None, num_limit_type=None):
+    if filter_jurnal_file is not None:
+        to_download = filterJurnals(to_download, filter_jurnal_file)
+
+    if min_date is not None:
+        to_download = filter_min_date(to_download, min_date)
+
+    if num_limit_type is not None and num_limit_type == 0:
+        to_download.sort(key=lambda x: int(x.year) if x.year is not None else 0, reverse=True)
+
+    if num_limit_type is not None and num_limit_type == 1:
+        to_download.sort(key=lambda x: int(x.cites_num) if x.cites_num is not None else 0, reverse=True)
+    return to_download
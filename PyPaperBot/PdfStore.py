@@ -0,0 +1,135 @@
+# PyPaperBot/PdfStore.py
+import os
+import json
+import shutil
+import hashlib
+import tempfile
+import threading
+from .NetInfo import NetInfo
+from .NegativeCache import paperKey
+
+DEFAULT_LIBRARY_DIR = os.path.join(os.getcwd(), 'cache', 'library')
+
+
+def sha256File(file_path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def linkFile(src, dest):
+    """
+    Makes 'dest' point to the same data as 'src' through a temporary name, so 'dest' is never half-written.
+    A hardlink is used when possible; across file systems (or where hardlinks are not supported) the file is copied.
+    """
+    fd, tmp_name = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(dest) or ".")
+    os.close(fd)
+    os.remove(tmp_name)
+    try:
+        try:
+            os.link(src, tmp_name)
+        except OSError:
+            shutil.copyfile(src, tmp_name)
+        os.replace(tmp_name, dest)
+    finally:
+        if os.path.exists(tmp_name):
+            os.remove(tmp_name)
+
+
+def sameFile(a, b):
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+class PdfStore:
+    """
+    A library of downloaded PDFs shared by every run, stored once per content under their SHA-256
+    (blobs/ab/abcd....pdf) with an index mapping each paper (DOI, or normalized title) to its blob.
+    Result folders get hardlinks to the blobs, so a paper found by several searches is kept once
+    on disk and papers already in the library are placed without any network request.
+    """
+
+    def __init__(self, library_dir=None):
+        self.library_dir = library_dir or NetInfo.PDF_LIBRARY_DIR or DEFAULT_LIBRARY_DIR
+        self.index_file = os.path.join(self.library_dir, 'index.json')
+        self._lock = threading.Lock()
+        self.index = self._load()
+
+    def _load(self):
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r') as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, IOError):
+                pass
+        return {}
+
+    def save(self):
+        with self._lock:
+            os.makedirs(self.library_dir, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=self.library_dir)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(self.index, f, indent=4)
+            os.replace(tmp_name, self.index_file)
+
+    def blobPath(self, sha256):
+        return os.path.join(self.library_dir, 'blobs', sha256[:2], sha256 + ".pdf")
+
+    def lookup(self, paper):
+        """Returns the index entry of the paper if its blob is still in the library, else None."""
+        key = paperKey(paper)
+        if key is None:
+            return None
+        with self._lock:
+            entry = self.index.get(key)
+        if entry is None or not os.path.exists(self.blobPath(entry["sha256"])):
+            return None
+        return entry
+
+    def holds(self, paper, file_path):
+        """True if 'file_path' already is this paper's copy from the library."""
+        entry = self.lookup(paper)
+        return entry is not None and sameFile(file_path, self.blobPath(entry["sha256"]))
+
+    def place(self, paper, file_path):
+        """Links the paper's PDF from the library to 'file_path'. Returns the index entry, or None if it is not stored."""
+        entry = self.lookup(paper)
+        if entry is None:
+            return None
+        blob = self.blobPath(entry["sha256"])
+        try:
+            if not sameFile(file_path, blob):
+                linkFile(blob, file_path)
+        except OSError as e:
+            print(f"    Warning: Could not place the PDF from the library. Reason: {e}")
+            return None
+        return entry
+
+    def add(self, paper, file_path, source):
+        """
+        Stores a freshly downloaded PDF in the library and indexes it for the paper.
+        If the same content is already stored, 'file_path' is replaced by a link to it.
+        """
+        key = paperKey(paper)
+        if key is None or not os.path.exists(file_path):
+            return None
+        try:
+            sha256 = sha256File(file_path)
+            blob = self.blobPath(sha256)
+            os.makedirs(os.path.dirname(blob), exist_ok=True)
+            if os.path.exists(blob):
+                if not sameFile(file_path, blob):
+                    linkFile(blob, file_path)
+            else:
+                linkFile(file_path, blob)
+        except OSError as e:
+            print(f"    Warning: Could not add the PDF to the library. Reason: {e}")
+            return None
+        entry = {"sha256": sha256, "size": os.path.getsize(blob), "source": str(source)}
+        with self._lock:
+            self.index[key] = entry
+        return entry
@@ -7,6 +7,27 @@ from .Crossref import getPapersInfo, save_papers_to_cache
 from .Downloader import downloadPapers
 from .Paper import generate_custom_bibtex, generate_citekeys
 from .MetadataFetcher import enrich_paper_with_abstract
+from .NetInfo import NetInfo
+
+def selectNonReviews(top_reviews, all_results, num_non_reviews):
+    review_titles = {p.title for p in top_reviews}
+    return [p for p in all_results if p.title not in review_titles][:num_non_reviews]
+
+def writeResults(final_paper_list, topic, start_year, end_year, base_dwn_dir):
+    """Prints the citekeys, creates the '<topic>_<years>' results folder with its references.bib, and returns the folder."""
+    print("\n--- Final Citekeys Assigned ---")
+    for p in final_paper_list:
+        print(f"  - {p.citekey:<25} | {p.title}")
+    print("-----------------------------\n")
+
+    folder_name = re.sub(r'[^\w\-_\. ]', '_', f"{topic.replace(' ', '_')}_{start_year}-{end_year}")
+    results_dir = os.path.join(base_dwn_dir, folder_name)
+    os.makedirs(results_dir, exist_ok=True)
+    print(f"Results will be saved in: {results_dir}")
+
+    bibtex_path = os.path.join(results_dir, "references.bib")
+    generate_custom_bibtex(final_paper_list, bibtex_path)
+    return results_dir
 
 def find_relevant_papers(
     topic,
@@ -17,26 +38,32 @@ def find_relevant_papers(
     num_non_reviews=6,
     s2_api_key=None,
     gemini_api_key=None,
+    use_async=False,
+    concurrency=None,
 ):
     """
     Finds, enriches, and downloads the most relevant papers for a given topic.
+    With use_async, each phase runs 'concurrency' (default NetInfo.ASYNC_CONCURRENCY) network calls at the same time.
     """
+    workers = (concurrency or NetInfo.ASYNC_CONCURRENCY) if use_async else 1
+
     print("--- Starting Relevance Search ---")
     print(f"Topic: {topic}, Date Range: {start_year}-{end_year}")
 
     # --- Phase 1: Find review papers ---
     print("\n[Phase 1/5] Searching for review papers...")
     review_query = f"{topic} review"
-    top_reviews = ScholarPapersInfo(review_query, range(1, 2), min_date=start_year, max_date=end_year, fetch_metadata=False)[:num_reviews]
+    top_reviews = ScholarPapersInfo(review_query, range(1, 2), min_date=start_year, max_date=end_year, fetch_metadata=False,
+                                    workers=workers)[:num_reviews]
     print(f"Selected top {len(top_reviews)} review papers.")
 
     # --- Phase 2: Find non-review papers ---
     print("\n[Phase 2/5] Searching for non-review papers...")
     all_papers_query = topic
     pages_to_search = 1 + ((num_non_reviews + len(top_reviews)) // 10)
-    all_results = ScholarPapersInfo(all_papers_query, range(1, pages_to_search + 1), min_date=start_year, max_date=end_year, fetch_metadata=False)
-    review_titles = {p.title for p in top_reviews}
-    top_non_reviews = [p for p in all_results if p.title not in review_titles][:num_non_reviews]
+    all_results = ScholarPapersInfo(all_papers_query, range(1, pages_to_search + 1), min_date=start_year, max_date=end_year, fetch_metadata=False,
+                                    workers=workers)
+    top_non_reviews = selectNonReviews(top_reviews, all_results, num_non_reviews)
     print(f"Selected top {len(top_non_reviews)} non-review papers.")
 
     final_paper_list = top_reviews + top_non_reviews
@@ -46,7 +73,7 @@ def find_relevant_papers(
 
     # --- Phase 3: Fetch full metadata (Authors, DOI, etc.) ---
     print("\n[Phase 3/5] Fetching full metadata from external sources...")
-    final_paper_list = getPapersInfo(final_paper_list, s2_api_key)
+    final_paper_list = getPapersInfo(final_paper_list, s2_api_key, workers if use_async else None)
 
     # --- Phase 4: Generate Citekeys and Update Cache ---
     print("\n[Phase 4/5] Generating definitive citekeys...")
@@ -57,22 +84,12 @@ def find_relevant_papers(
 
     # --- Phase 5: Download ---
     print("\n[Phase 5/5] Downloading papers...")
-    print("\n--- Final Citekeys Assigned ---")
-    for p in final_paper_list:
-        print(f"  - {p.citekey:<25} | {p.title}")
-    print("-----------------------------\n")
-
-    folder_name = re.sub(r'[^\w\-_\. ]', '_', f"{topic.replace(' ', '_')}_{start_year}-{end_year}")
-    results_dir = os.path.join(base_dwn_dir, folder_name)
-    os.makedirs(results_dir, exist_ok=True)
-    print(f"Results will be saved in: {results_dir}")
-
-    bibtex_path = os.path.join(results_dir, "references.bib")
-    generate_custom_bibtex(final_paper_list, bibtex_path)
+    results_dir = writeResults(final_paper_list, topic, start_year, end_year, base_dwn_dir)
 
     downloadPapers(
         final_paper_list,
         results_dir,
         num_limit=len(final_paper_list),
         gemini_api_key=gemini_api_key,
+        workers=workers,
     )
\ No newline at end of file
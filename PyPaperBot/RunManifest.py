@@ -0,0 +1,75 @@
+# PyPaperBot/RunManifest.py
+import os
+import json
+import time
+import threading
+from .NegativeCache import paperKey
+
+MANIFEST_NAME = '.pypaperbot_manifest.jsonl'
+
+
+def manifestKey(paper):
+    """Identifies a paper by DOI, then by citekey, then by normalized title."""
+    if not paper.DOI and paper.citekey:
+        return "citekey:" + paper.citekey
+    return paperKey(paper)
+
+
+class RunManifest:
+    """
+    Append-only record (one JSON object per line) of the papers downloaded to a directory:
+    key, file, size, sha256 and source. It is read once when a run starts, so a rerun of an
+    interrupted job skips the papers it already has without any network request.
+    Later lines win, and a truncated last line (from a crash while writing) is ignored.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.path = os.path.join(directory, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        self.entries = self._load()
+
+    def _load(self):
+        entries = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        entries[entry["key"]] = entry
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue
+        return entries
+
+    def lookup(self, paper):
+        """Returns the paper's entry if its file is still in the directory with the recorded size, else None."""
+        key = manifestKey(paper)
+        with self._lock:
+            entry = self.entries.get(key) if key else None
+        if entry is None:
+            return None
+        file_path = os.path.join(self.directory, entry["file"])
+        try:
+            if os.path.getsize(file_path) != entry["size"]:
+                return None
+        except OSError:
+            return None
+        return entry
+
+    def record(self, paper, file_path, source, sha256=None):
+        key = manifestKey(paper)
+        if key is None:
+            return
+        entry = {
+            "key": key,
+            "file": os.path.basename(file_path),
+            "size": os.path.getsize(file_path),
+            "sha256": sha256,
+            "source": str(source),
+            "time": time.time(),
+        }
+        with self._lock:
+            self.entries[key] = entry
+            os.makedirs(self.directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(entry) + "\n")
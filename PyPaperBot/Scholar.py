@@ -1,12 +1,13 @@
 # PyPaperBot/Scholar.py
 import time
-import requests
 import functools
-import undetected_chromedriver as uc
-from selenium.webdriver.chrome.options import Options
+from concurrent.futures import ThreadPoolExecutor
 from .HTMLparsers import schoolarParser
 from .Crossref import getPapersInfo
 from .NetInfo import NetInfo
+from .BrowserPool import getBrowserPool
+from .Throttle import getRateLimiter
+from .HttpClient import getHttpClient
 from .Paper import Paper
 
 
@@ -22,26 +23,41 @@ def waithIPchange():
             return True
 
 
-def scholar_requests(scholar_pages, url, restrict, chrome_version, scholar_results=10, fetch_metadata=True):
-    javascript_error = "Sorry, we can't verify that you're not a robot when JavaScript is turned off"
+JAVASCRIPT_ERROR = "Sorry, we can't verify that you're not a robot when JavaScript is turned off"
+
+
+def fetchScholarPage(url, page, chrome_version=None, scholar_results=10):
+    """Returns the HTML of a Scholar results page (starting from 1), through the browser pool if chrome_version is set."""
+    res_url = url % (scholar_results * (page - 1))
+    if chrome_version is not None:
+        getRateLimiter().wait(res_url)
+        with getBrowserPool(chrome_version).browser() as driver:
+            driver.get(res_url)
+            return driver.page_source
+    return getHttpClient().get(res_url, headers=NetInfo.HEADERS).text
+
+
+def toPapers(results, url):
+    """Creates basic Paper objects (without Crossref info) from parsed Scholar results."""
+    return [Paper(p['title'], p['link'], url, p['cites'], p['link_pdf'], p['year'], p['authors']) for p in results]
+
+
+def scholar_requests(scholar_pages, url, restrict, chrome_version, scholar_results=10, fetch_metadata=True, workers=1):
     to_download = []
-    driver = None
+    if chrome_version is not None:
+        print("Using Selenium driver")
+    prefetched = {}
+    if workers > 1:
+        # Fetch all the pages at once; a blocked page is fetched again below, one at a time
+        scholar_pages = list(scholar_pages)
+        with ThreadPoolExecutor(max_workers=min(workers, len(scholar_pages)) or 1) as executor:
+            pages = executor.map(lambda i: fetchScholarPage(url, i, chrome_version, scholar_results), scholar_pages)
+            prefetched = dict(zip(scholar_pages, pages))
     for i in scholar_pages:
         while True:
-            res_url = url % (scholar_results * (i - 1))
-            if chrome_version is not None:
-                if driver is None:
-                    print("Using Selenium driver")
-                    options = Options()
-                    options.add_argument('--headless')
-                    driver = uc.Chrome(headless=True, use_subprocess=False, version_main=chrome_version)
-                driver.get(res_url)
-                html = driver.page_source
-            else:
-                html = requests.get(res_url, headers=NetInfo.HEADERS)
-                html = html.text
+            html = prefetched.pop(i, None) or fetchScholarPage(url, i, chrome_version, scholar_results)
 
-            if javascript_error in html:
+            if JAVASCRIPT_ERROR in html:
                 is_continue = waithIPchange()
                 if not is_continue:
                     return to_download
@@ -63,11 +79,7 @@ def scholar_requests(scholar_pages, url, restrict, chrome_version, scholar_resul
                 to_download.append(papersInfo)
             else:
                 # The new, fast path: just create basic Paper objects without Crossref info
-                paper_objects = [
-                    Paper(p['title'], p['link'], url, p['cites'], p['link_pdf'], p['year'], p['authors'])
-                    for p in papers
-                ]
-                to_download.append(paper_objects)
+                to_download.append(toPapers(papers, url))
         else:
             print("Paper not found...")
 
@@ -87,11 +99,8 @@ def parseSkipList(skip_words):
     return output_param
 
 
-def ScholarPapersInfo(query, scholar_pages, restrict=None, min_date=None, max_date=None, scholar_results=10, chrome_version=None, cites=None, skip_words=None, fetch_metadata=True):
-    """
-    Main function to get paper info from Google Scholar.
-    Includes 'fetch_metadata' flag to control expensive Crossref lookups.
-    """
+def scholarUrl(query, min_date=None, max_date=None, cites=None, skip_words=None):
+    """Builds the Scholar search URL; its '%d' placeholder takes the index of the first result."""
     url = r"https://scholar.google.com/scholar?hl=en&as_vis=1&as_sdt=1,5&start=%d"
     if query:
         if len(query) > 7 and (query.startswith("http://") or query.startswith("https://")):
@@ -106,7 +115,16 @@ def ScholarPapersInfo(query, scholar_pages, restrict=None, min_date=None, max_da
         url += f"&as_ylo={min_date}"
     if max_date:
         url += f"&as_yhi={max_date}"
+    return url
+
 
-    to_download = scholar_requests(scholar_pages, url, restrict, chrome_version, scholar_results, fetch_metadata)
+def ScholarPapersInfo(query, scholar_pages, restrict=None, min_date=None, max_date=None, scholar_results=10, chrome_version=None, cites=None, skip_words=None, fetch_metadata=True, workers=1):
+    """
+    Main function to get paper info from Google Scholar.
+    Includes 'fetch_metadata' flag to control expensive Crossref lookups.
+    With 'workers' > 1, up to that many result pages are fetched at the same time.
+    """
+    url = scholarUrl(query, min_date, max_date, cites, skip_words)
+    to_download = scholar_requests(scholar_pages, url, restrict, chrome_version, scholar_results, fetch_metadata, workers)
 
     return [item for sublist in to_download for item in sublist]
\ No newline at end of file
@@ -0,0 +1,83 @@
+# PyPaperBot/SourceRanker.py
+import os
+import random
+import threading
+from .Utils import loadJson, saveJson
+
+STATS_FILE = os.path.join(os.getcwd(), 'cache', 'source_stats.json')
+ALL_PREFIXES = "*"
+
+
+def doiPrefix(paper):
+    """Groups papers by publisher through their DOI prefix (e.g. '10.1002' for Wiley)."""
+    if paper.DOI and "/" in paper.DOI:
+        return paper.DOI.split("/", 1)[0].strip().lower()
+    return "no-doi"
+
+
+class SourceRanker:
+    """
+    Keeps per-source success and latency statistics, broken down by DOI prefix and persisted
+    across runs, and uses them to order the download sources for each paper.
+
+    Sources are tried by decreasing success-per-second (estimated success rate divided by mean
+    latency), which minimizes the expected time to the first hit. The rate for a prefix is
+    smoothed towards the source's overall rate until enough papers of that prefix were seen.
+    Sources that practically never succeed for a prefix are skipped, except for an
+    'explore' share of papers that keeps their statistics from going stale.
+    """
+    PRIOR_WEIGHT = 5
+    DEFAULT_LATENCY = 10.0
+    MIN_ATTEMPTS_TO_SKIP = 10
+    SKIP_BELOW = 0.02
+
+    def __init__(self, stats_file=None, explore=0.1):
+        self.stats_file = stats_file or STATS_FILE
+        self.explore = explore
+        self._lock = threading.Lock()
+        self.stats = loadJson(self.stats_file)
+
+    def save(self):
+        with self._lock:
+            saveJson(self.stats_file, self.stats)
+
+    def _entry(self, prefix, source_name):
+        return self.stats.get(prefix, {}).get(source_name, {"attempts": 0, "successes": 0, "latency": 0.0})
+
+    def record(self, paper, source_name, success, latency):
+        with self._lock:
+            for prefix in (doiPrefix(paper), ALL_PREFIXES):
+                entry = self.stats.setdefault(prefix, {}).setdefault(
+                    source_name, {"attempts": 0, "successes": 0, "latency": 0.0})
+                entry["attempts"] += 1
+                entry["successes"] += 1 if success else 0
+                entry["latency"] += latency
+
+    def estimate(self, paper, source_name):
+        """Returns (estimated success rate, mean latency in seconds, attempts) of a source for this paper."""
+        with self._lock:
+            overall = self._entry(ALL_PREFIXES, source_name)
+            local = self._entry(doiPrefix(paper), source_name)
+        # Unknown sources start optimistic so that they get tried
+        prior = (overall["successes"] + 1) / (overall["attempts"] + 2)
+        rate = (local["successes"] + self.PRIOR_WEIGHT * prior) / (local["attempts"] + self.PRIOR_WEIGHT)
+        timed = local if local["attempts"] else overall
+        latency = timed["latency"] / timed["attempts"] if timed["attempts"] else self.DEFAULT_LATENCY
+        return rate, max(latency, 0.1), local["attempts"]
+
+    def order(self, paper, sources):
+        """Returns the sources to try for this paper, best first. Ties keep the default priority order."""
+        exploring = random.random() < self.explore
+        scored, skipped = [], []
+        for source in sources:
+            rate, latency, attempts = self.estimate(paper, source.name)
+            if attempts >= self.MIN_ATTEMPTS_TO_SKIP and rate < self.SKIP_BELOW and not exploring:
+                skipped.append(source)
+            else:
+                scored.append((-rate / latency, source.priority, source))
+        if not scored:
+            return list(sources)
+        if skipped:
+            print(f"    -> Skipping {', '.join(s.name for s in skipped)} (rarely successful for DOI prefix {doiPrefix(paper)}).")
+        scored.sort(key=lambda item: (item[0], item[1]))
+        return [source for _, _, source in scored]
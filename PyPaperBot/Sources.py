@@ -0,0 +1,623 @@
+# PyPaperBot/Sources.py
+from os import path
+import os
+import time
+import shutil
+import tempfile
+import threading
+import json
+import base64
+import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.support.ui import WebDriverWait
+from .PapersFilters import similarStrings
+from .HTMLparsers import getSchiHubPDF, get_scidb_pdf_link, scrape_page_for_pdf_link
+from .NetInfo import NetInfo
+from .Utils import URLjoin
+from .PartialDownload import PartialDownload
+from .BrowserPool import getBrowserPool
+from .MirrorHealth import reportMirror
+from .UnpaywallCache import getUnpaywallCache
+from .Throttle import getRateLimiter
+import arxiv
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait, FIRST_COMPLETED
+
+def _drain_performance_log(driver):
+    """Returns the CDP events Chrome logged since the last call (Selenium exposes them through the performance log)."""
+    events = []
+    for entry in driver.get_log('performance'):
+        try:
+            events.append(json.loads(entry['message'])['message'])
+        except (KeyError, ValueError):
+            continue
+    return events
+
+
+def _completed_download(temp_dir, files_before):
+    """Returns the path of a finished download in 'temp_dir', once Chrome has renamed its .crdownload file."""
+    new_files = set(os.listdir(temp_dir)) - files_before
+    if not new_files or any(f.endswith(('.crdownload', '.tmp')) for f in new_files):
+        return None
+    return os.path.join(temp_dir, new_files.pop())
+
+
+def _wait_for_pdf(driver, temp_dir, files_before, timeout):
+    """
+    Waits for the PDF requested by the browser, reacting to whichever comes first:
+    the PDF response finishing in the CDP network events (its bytes are then read straight
+    from Chrome with Network.getResponseBody), or Chrome completing a download into 'temp_dir'.
+    Returns (bytes, None), (None, file path) or (None, None) on timeout.
+    """
+    pdf_requests = set()
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        for event in _drain_performance_log(driver):
+            method, params = event.get('method'), event.get('params', {})
+            if method == 'Network.responseReceived' and 'pdf' in params.get('response', {}).get('mimeType', '').lower():
+                pdf_requests.add(params.get('requestId'))
+            elif method == 'Network.loadingFinished' and params.get('requestId') in pdf_requests:
+                try:
+                    body = driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': params['requestId']})
+                    data = body.get('body', '')
+                    return (base64.b64decode(data) if body.get('base64Encoded') else data.encode('latin-1')), None
+                except WebDriverException:
+                    # Bodies of navigations turned into downloads are not kept by Chrome: wait for the file instead
+                    pass
+        downloaded = _completed_download(temp_dir, files_before)
+        if downloaded:
+            return None, downloaded
+        time.sleep(NetInfo.BROWSER_POLL_INTERVAL)
+    return None, None
+
+
+def _find_scihub_pdf_link(driver, timeout):
+    """Waits until the Sci-Hub page shows its PDF frame and returns the link, or None on timeout."""
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=NetInfo.BROWSER_POLL_INTERVAL).until(
+            lambda d: getSchiHubPDF(d.page_source))
+    except TimeoutException:
+        return None
+
+
+def download_from_scihub_with_browser(driver, temp_dir, scihub_url, paper_obj, final_file_path):
+    """
+    Uses a pre-initialized browser and a persistent temp folder to download from Sci-Hub.
+    The browser must have performance logging enabled so network events can be read.
+    """
+    print("    -> Using browser fallback for Sci-Hub...")
+    try:
+        files_before = set(os.listdir(temp_dir))
+
+        try:
+            driver.get(scihub_url)
+        except WebDriverException:
+            reportMirror(scihub_url, False)
+            raise
+        pdf_link = _find_scihub_pdf_link(driver, NetInfo.BROWSER_PAGE_TIMEOUT)
+        # A page that is not Sci-Hub at all means the mirror is down or blocked, not that the paper is missing
+        reportMirror(scihub_url, bool(pdf_link) or "sci-hub" in driver.page_source.lower())
+        if not pdf_link:
+            print("    -> Browser could not find PDF link on Sci-Hub page.")
+            return False
+
+        _drain_performance_log(driver)
+        driver.get(pdf_link)
+        print("    -> Waiting for download to complete...")
+        content, downloaded_file = _wait_for_pdf(driver, temp_dir, files_before, NetInfo.BROWSER_DOWNLOAD_TIMEOUT)
+
+        if content is not None:
+            return saveFile(final_file_path, content, paper_obj, "Sci-Hub (Browser)")
+        if downloaded_file is None:
+            print(f"    ERROR: No PDF was received within {NetInfo.BROWSER_DOWNLOAD_TIMEOUT} seconds.")
+            return False
+
+        with open(downloaded_file, 'rb') as f:
+            is_pdf = f.read(1024).find(PDF_MAGIC) != -1
+        if not is_pdf or os.path.getsize(downloaded_file) <= 1024:
+            print("    ERROR: The downloaded file is not a valid PDF.")
+            os.remove(downloaded_file)
+            return False
+        # Move next to the target first, so the final rename is atomic even across file systems
+        tmp_name = final_file_path + ".tmp"
+        shutil.move(downloaded_file, tmp_name)
+        os.replace(tmp_name, final_file_path)
+        paper_obj.downloaded = True
+        paper_obj.downloadedFrom = "Sci-Hub (Browser)"
+        print("    Success: Downloaded from Sci-Hub (Browser).")
+        return True
+
+    except Exception as e:
+        print(f"    ERROR: Browser download from Sci-Hub failed. Reason: {e}")
+
+    finally:
+        if driver:
+            driver.get("about:blank")
+
+    return False
+
+def _execute_arxiv_search(title):
+    query = f'ti:"{title}"'
+    print(f"    -> Searching arXiv with query: {query}")
+    search = arxiv.Search(query=query, max_results=1)
+    result = next(search.results(), None)
+    if result and similarStrings(result.title.lower(), title.lower(), 0.8) > 0.8:
+        print(f"    -> Found matching paper on arXiv: {result.title}")
+        return result.pdf_url
+    return None
+
+def get_arxiv_link(title, paper_obj, negative_cache=None, resolver=None):
+    """
+    Returns the arXiv PDF link of the paper with this title, or None.
+    With a NegativeCache, papers with no match recently are not searched again, and new
+    misses are recorded (timeouts and errors are not). With an ArxivResolver, links it
+    already resolved (by batch or in an earlier run) are used without a search.
+    """
+    if negative_cache is not None and negative_cache.contains("arXiv", paper_obj):
+        print("    -> No match on arXiv recently, skipping search.")
+        return None
+    if resolver is not None:
+        cached_url = resolver.lookup(title)
+        if cached_url:
+            print(f"    -> Found paper on arXiv (cached): {cached_url}")
+            return cached_url
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # The timeout covers the search only, not the wait for arXiv's rate budget
+        getRateLimiter().wait("export.arxiv.org")
+        future = executor.submit(_execute_arxiv_search, title)
+        try:
+            pdf_url = future.result(timeout=15)
+        except TimeoutError:
+            print("    arXiv search timed out after 15 seconds.")
+            return None
+        except Exception as e:
+            print(f"    arXiv search raised an exception: {e}")
+            return None
+    if negative_cache is not None and not pdf_url:
+        negative_cache.add("arXiv", paper_obj)
+    if resolver is not None and pdf_url:
+        resolver.remember(title, pdf_url)
+    return pdf_url
+
+PDF_MAGIC = b"%PDF-"
+
+
+def _max_size_mb():
+    return NetInfo.MAX_PDF_SIZE // (1024 * 1024)
+
+
+class PDFStream:
+    """
+    A streamed response whose first bytes have been checked to be a PDF.
+    Only the first chunk is held in memory; the rest is read while the file is saved.
+    When 'partial' is set, the body is written to its .part file, starting at 'offset'.
+    """
+    chunk_size = 64 * 1024
+
+    def __init__(self, response, head, rest, partial=None, offset=0):
+        self.response = response
+        self.head = head
+        self._rest = rest
+        self.partial = partial
+        self.offset = offset
+
+    @classmethod
+    def open(cls, response, partial=None):
+        """Returns a PDFStream for a response opened with stream=True, or None (closing it) if it is not a PDF."""
+        resumed = partial is not None and partial.accept(response)
+        offset = partial.offset if resumed else 0
+        length = response.headers.get('content-length', '')
+        if length.isdigit() and offset + int(length) > NetInfo.MAX_PDF_SIZE:
+            print(f"    PDF is larger than the {_max_size_mb()} MB limit, skipping.")
+            response.close()
+            return None
+        rest = response.iter_content(cls.chunk_size)
+        if resumed:
+            # The first bytes were validated when the download was started
+            return cls(response, b"", rest, partial, offset)
+        head = b""
+        for chunk in rest:
+            head += chunk
+            if len(head) >= 1024:
+                break
+        # The PDF header may be preceded by a few junk bytes, but must be within the first 1024
+        if head.find(PDF_MAGIC, 0, 1024) == -1:
+            print("    Response claims to be a PDF but does not start with '%PDF-'.")
+            response.close()
+            return None
+        return cls(response, head, rest, partial)
+
+    def chunks(self):
+        if self.head:
+            yield self.head
+        yield from self._rest
+
+    def close(self):
+        self.response.close()
+
+
+def saveFile(file_name, content, paper, dwn_source):
+    """
+    Writes a PDF to 'file_name' through a temporary file that is renamed into place once complete,
+    so an interrupted download never leaves a half-written PDF behind.
+    'content' is either the PDF bytes or a PDFStream. Streams with a PartialDownload are written to
+    its .part file, which is kept with an up-to-date journal if the transfer drops and can be resumed.
+    Downloads over NetInfo.MAX_PDF_SIZE are dropped.
+    """
+    stream = content if isinstance(content, PDFStream) else None
+    chunks = stream.chunks() if stream else [content]
+    partial = stream.partial if stream else None
+    tmp_name = None
+    keep_partial = False
+    try:
+        if partial:
+            tmp_name = partial.path
+            f = open(tmp_name, 'ab' if stream.offset else 'wb')
+        else:
+            fd, tmp_name = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=path.dirname(file_name) or ".")
+            f = os.fdopen(fd, 'wb')
+        size = stream.offset if stream else 0
+        journaled = size
+        with f:
+            for chunk in chunks:
+                if size == 0 and chunk.find(PDF_MAGIC, 0, 1024) == -1:
+                    print("    ERROR: The downloaded file is not a PDF.")
+                    return False
+                size += len(chunk)
+                if size > NetInfo.MAX_PDF_SIZE:
+                    print(f"    ERROR: File is larger than the {_max_size_mb()} MB limit.")
+                    return False
+                f.write(chunk)
+                if partial and size - journaled >= partial.JOURNAL_EVERY:
+                    f.flush()
+                    partial.save_journal(size)
+                    journaled = size
+        if size <= 1024:
+            print("    ERROR: File write failed or the file is too small.")
+            return False
+        os.replace(tmp_name, file_name)
+        tmp_name = None
+        paper.downloaded = True
+        paper.downloadedFrom = dwn_source
+        print(f"    Success: Downloaded from {dwn_source}.")
+        return True
+    except requests.exceptions.RequestException as e:
+        print(f"    ERROR: Download was interrupted. Reason: {e}")
+        if partial and partial.resumable and path.exists(partial.path):
+            partial.save_journal(os.path.getsize(partial.path))
+            print("    -> Partial file kept, the download will resume on the next run.")
+            keep_partial = True
+        return False
+    except (IOError, PermissionError) as e:
+        print(f"    ERROR: Could not save file. Reason: {e}")
+        return False
+    finally:
+        if stream:
+            stream.close()
+        if partial:
+            # After a successful rename this only removes the journal
+            if not keep_partial:
+                partial.discard()
+        elif tmp_name and path.exists(tmp_name):
+            os.remove(tmp_name)
+
+def isPDFResponse(r):
+    return r.ok and 'application/pdf' in r.headers.get('content-type', '').lower()
+
+
+def openPDF(r, partial=None, check_type=True):
+    """
+    Returns a PDFStream for a streamed response if it is a valid PDF, otherwise closes it and returns None.
+    With check_type=False any successful response is accepted as long as its body starts like a PDF.
+    """
+    if isPDFResponse(r) or (r.ok and not check_type):
+        return PDFStream.open(r, partial)
+    r.close()
+    return None
+
+
+class SourceRace:
+    """
+    Decides which source wins when several sources are resolved at the same time.
+    The first source that finds a valid PDF wins; sources that find one within
+    NetInfo.RACE_TIE_WINDOW seconds of it compete on priority (lower wins).
+    The race is only over (cancelled) once the winner saved its file: if saving fails,
+    the claim passes to the best waiting source, or to the next one that finds a PDF.
+    """
+
+    def __init__(self, tie_window=None):
+        self.tie_window = NetInfo.RACE_TIE_WINDOW if tie_window is None else tie_window
+        self.cancelled = threading.Event()
+        self.winner = None
+        self._offers = []
+        self._deadline = None
+        self._cond = threading.Condition()
+
+    def claim(self, source):
+        """
+        Called by a source holding a valid PDF. Returns True if that source may save it, in which
+        case it must call finish() afterwards. Waits while another source is saving.
+        """
+        with self._cond:
+            if self.cancelled.is_set():
+                return False
+            self._offers.append(source)
+            if self._deadline is None:
+                self._deadline = time.monotonic() + self.tie_window
+            while not self.cancelled.is_set():
+                if self.winner is source:
+                    return True
+                remaining = None
+                if self.winner is None:
+                    remaining = self._deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.winner = min(self._offers, key=lambda s: s.priority)
+                        self._cond.notify_all()
+                        continue
+                self._cond.wait(remaining)
+            self._offers.remove(source)
+            return False
+
+    def finish(self, source, saved):
+        """Called by the winner after saving: ends the race if it saved the file, else gives its claim up."""
+        with self._cond:
+            self._offers.remove(source)
+            if saved:
+                self.cancelled.set()
+            else:
+                self.winner = min(self._offers, key=lambda s: s.priority) if self._offers else None
+            self._cond.notify_all()
+
+
+class PaperSource:
+    """
+    A place a paper's PDF can be downloaded from.
+    Subclasses implement fetch(), which saves the PDF to 'pdf_dir' and returns True on success.
+    When a SourceRace is given, fetch() must save through save() (which claims the race) and give up
+    once the race is cancelled.
+    Subclasses call miss() when the source definitely has nothing for the paper.
+    """
+    name = None
+    needs_doi = True
+    # Whether the source can run at the same time as other sources for the same paper
+    raceable = True
+
+    def __init__(self, session, limiter, priority=0, negative_cache=None):
+        self.session = session
+        self.limiter = limiter
+        self.priority = priority
+        self.negative_cache = negative_cache
+
+    def miss(self, paper):
+        if self.negative_cache is not None:
+            self.negative_cache.add(self.name, paper)
+
+    def applies(self, paper):
+        return bool(paper.DOI) or not self.needs_doi
+
+    def get(self, url, **kwargs):
+        with self.limiter.slot(url):
+            return self.session.get(url, **kwargs)
+
+    def request(self, paper, pdf_dir, url, **kwargs):
+        """
+        Starts a streamed GET for 'url', asking only for the missing bytes if an earlier run left a
+        partial download of this paper from the same URL. Returns the response and its PartialDownload.
+        """
+        partial = PartialDownload(pdf_dir, paper, url)
+        headers = dict(kwargs.pop('headers', None) or {})
+        r = self.session.get(url, stream=True, headers={**headers, **partial.range_headers()}, **kwargs)
+        if r.status_code == 416 and partial.offset:
+            # The partial file no longer matches what the server has: start over
+            r.close()
+            partial.discard()
+            partial = PartialDownload(pdf_dir, paper, url)
+            r = self.session.get(url, stream=True, headers=headers, **kwargs)
+        return r, partial
+
+    def download(self, paper, pdf_dir, url, label, race=None, check_type=True, **kwargs):
+        """Streams 'url' into 'pdf_dir' if it is a PDF. The host slot is held until the body has been read."""
+        with self.limiter.slot(url):
+            r, partial = self.request(paper, pdf_dir, url, **kwargs)
+            stream = openPDF(r, partial, check_type)
+            if stream is None:
+                print(f"    {label} link did not return a valid PDF (Status: {r.status_code}).")
+                return False
+            return self.save(paper, pdf_dir, stream, label, race)
+
+    def save(self, paper, pdf_dir, content, label, race=None):
+        if race is not None and not race.claim(self):
+            if isinstance(content, PDFStream):
+                content.close()
+            return False
+        saved = False
+        try:
+            saved = saveFile(pdf_dir, content, paper, label)
+        finally:
+            if race is not None:
+                race.finish(self, saved)
+        return saved
+
+    @staticmethod
+    def cancelled(race):
+        return race is not None and race.cancelled.is_set()
+
+    def fetch(self, paper, pdf_dir, race=None):
+        raise NotImplementedError
+
+
+class UnpaywallSource(PaperSource):
+    name = "Unpaywall"
+    # Set to an UnpaywallSnapshot to resolve DOIs locally; the API is only asked for DOIs it does not have
+    snapshot = None
+
+    def lookup(self, doi):
+        entry = self.snapshot.lookup(doi) if self.snapshot is not None else None
+        if entry is not None:
+            print("    -> Resolved from the local Unpaywall snapshot.")
+            return entry["url"]
+        with self.limiter.slot("api.unpaywall.org"):
+            return getUnpaywallCache().getDocLink(doi)
+
+    def fetch(self, p, pdf_dir, race=None):
+        print("--> Checking Unpaywall...")
+        try:
+            unpaywall_url = self.lookup(p.DOI)
+            if not unpaywall_url:
+                print("    No open access URL found on Unpaywall.")
+                self.miss(p)
+                return False
+            print(f"    -> Unpaywall found an OA link: {unpaywall_url}")
+            with self.limiter.slot(unpaywall_url):
+                r, partial = self.request(p, pdf_dir, unpaywall_url, timeout=30, verify=False, allow_redirects=True)
+                content_type = r.headers.get('content-type', '').lower()
+                if r.ok and 'application/pdf' in content_type:
+                    stream = PDFStream.open(r, partial)
+                    return stream is not None and self.save(p, pdf_dir, stream, "Unpaywall", race)
+                if not (r.ok and 'text/html' in content_type):
+                    r.close()
+                    print(f"    Unpaywall link did not return a valid PDF (Status: {r.status_code}).")
+                    return False
+                html, page_url = r.text, r.url
+            print("    -> Unpaywall returned an HTML page, attempting to find PDF link...")
+            scraped_link = scrape_page_for_pdf_link(html, page_url)
+            if scraped_link and not self.cancelled(race):
+                return self.download(p, pdf_dir, scraped_link, "Unpaywall (scraped)", race, check_type=False,
+                                     timeout=30, verify=False)
+        except Exception as e:
+            print(f"    Unpaywall check failed with an error: {e}")
+        return False
+
+
+class DirectDOISource(PaperSource):
+    name = "Direct DOI"
+
+    def fetch(self, p, pdf_dir, race=None):
+        print("--> Checking direct DOI link...")
+        try:
+            direct_url = f"https://doi.org/{p.DOI}"
+            return self.download(p, pdf_dir, direct_url, "Direct DOI", race,
+                                 headers=NetInfo.HEADERS, timeout=30, allow_redirects=True)
+        except Exception as e:
+            print(f"    Direct DOI check failed with an error: {e}")
+        return False
+
+
+class ArxivSource(PaperSource):
+    name = "arXiv"
+    needs_doi = False
+    # Set to an ArxivResolver to use batch-resolved links
+    resolver = None
+
+    def fetch(self, p, pdf_dir, race=None):
+        print("--> Checking arXiv...")
+        with self.limiter.slot("export.arxiv.org"):
+            arxiv_url = get_arxiv_link(p.title, p, self.negative_cache, self.resolver)
+        if not arxiv_url:
+            print("    No matching paper found on arXiv.")
+            return False
+        if self.cancelled(race):
+            return False
+        try:
+            return self.download(p, pdf_dir, arxiv_url, "arXiv", race, timeout=30, verify=False)
+        except Exception as e:
+            print(f"    arXiv download failed with an error: {e}")
+        return False
+
+
+class SciDBSource(PaperSource):
+    name = "Anna's Archive"
+
+    def fetch(self, p, pdf_dir, race=None):
+        print("--> Checking Anna's Archive...")
+        scidb_url = URLjoin(NetInfo.SciDB_URL, p.DOI)
+        try:
+            try:
+                r = self.get(scidb_url, headers=NetInfo.HEADERS, timeout=30)
+            except requests.exceptions.RequestException:
+                reportMirror(scidb_url, False)
+                raise
+            reportMirror(scidb_url, r.status_code < 500)
+            if not r.ok:
+                print(f"    Could not reach Anna's Archive for this paper (Status: {r.status_code}).")
+                if r.status_code == 404:
+                    self.miss(p)
+                return False
+            pdf_link = get_scidb_pdf_link(r.text)
+            if not pdf_link:
+                print("    Could not find PDF link on Anna's Archive page.")
+                self.miss(p)
+                return False
+            if self.cancelled(race):
+                return False
+            return self.download(p, pdf_dir, pdf_link, "Anna's Archive", race, check_type=False, timeout=45)
+        except Exception as e:
+            print(f"    Anna's Archive check failed with an error: {e}")
+        return False
+
+
+class SciHubSource(PaperSource):
+    name = "Sci-Hub"
+    # Browsers are scarce and slow, so Sci-Hub always runs last on its own
+    raceable = False
+
+    def __init__(self, session, limiter, pool=None, priority=0, negative_cache=None):
+        super().__init__(session, limiter, priority, negative_cache)
+        self.pool = pool
+
+    def fetch(self, p, pdf_dir, race=None):
+        print("--> Checking Sci-Hub...")
+        scihub_url_to_try = URLjoin(NetInfo.SciHub_URL, p.DOI)
+        # The shared pool is only looked up here, so no browser is started unless Sci-Hub is needed
+        pool = self.pool or getBrowserPool()
+        with pool.browser() as browser:
+            return download_from_scihub_with_browser(browser, browser.download_dir, scihub_url_to_try, p, pdf_dir)
+
+
+def defaultSources(session, limiter, pool=None, negative_cache=None, arxiv_resolver=None, unpaywall_snapshot=None):
+    """Returns the download sources in their default priority order."""
+    unpaywall_source = UnpaywallSource(session, limiter)
+    unpaywall_source.snapshot = unpaywall_snapshot
+    arxiv_source = ArxivSource(session, limiter)
+    arxiv_source.resolver = arxiv_resolver
+    sources = [
+        unpaywall_source,
+        DirectDOISource(session, limiter),
+        arxiv_source,
+        SciDBSource(session, limiter),
+        SciHubSource(session, limiter, pool),
+    ]
+    for priority, source in enumerate(sources):
+        source.priority = priority
+        source.negative_cache = negative_cache
+    return sources
+
+
+def raceSources(p, pdf_dir, sources):
+    """
+    Runs all the given sources for a paper at the same time and keeps the first valid PDF.
+    Sources still running when a winner is chosen stop at their next step, and are waited for
+    so none of them is still writing files or caches when this returns.
+    Returns (source, success, seconds) for every source that finished on its own.
+    """
+    print(f"--> Racing {', '.join(s.name for s in sources)}...")
+    race = SourceRace()
+
+    def run(source):
+        start = time.monotonic()
+        ok = source.fetch(p, pdf_dir, race)
+        # A source stopped by another source's win says nothing about its own success rate
+        if ok or not race.cancelled.is_set():
+            return source, bool(ok), time.monotonic() - start
+        return None
+
+    outcomes = []
+    executor = ThreadPoolExecutor(max_workers=len(sources))
+    try:
+        pending = {executor.submit(run, source) for source in sources}
+        while pending and not any(ok for _, ok, _ in outcomes):
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            outcomes.extend(f.result() for f in done if f.result() is not None)
+    finally:
+        race.cancelled.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+    return outcomes
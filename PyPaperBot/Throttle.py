@@ -0,0 +1,184 @@
+# PyPaperBot/Throttle.py
+import time
+import threading
+import requests
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+from .NetInfo import NetInfo
+
+
+def hostOf(url):
+    """Returns the lower-cased host name of a URL (or the string itself if it is already a host)."""
+    if not url:
+        return ""
+    host = urlparse(url).hostname if "//" in url else url
+    return (host or "").lower()
+
+
+def budgetKey(host, table, default):
+    """Finds the entry of 'table' for a host or its closest parent domain; returns (key, value)."""
+    parts = host.split(".")
+    for i in range(len(parts) - 1):
+        candidate = ".".join(parts[i:])
+        if candidate in table:
+            return candidate, table[candidate]
+    return host, default
+
+
+class HostLimiter:
+    """
+    Caps the number of in-flight requests per host.
+    Limits are matched on the host or any of its parent domains, so an entry for
+    'annas-archive.org' also covers 'downloads.annas-archive.org'.
+    """
+
+    def __init__(self, limits=None, default_limit=None):
+        self.limits = dict(NetInfo.HOST_CONCURRENCY if limits is None else limits)
+        self.default_limit = default_limit or NetInfo.DEFAULT_HOST_CONCURRENCY
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, url):
+        key, limit = budgetKey(hostOf(url), self.limits, self.default_limit)
+        with self._lock:
+            if key not in self._semaphores:
+                self._semaphores[key] = threading.BoundedSemaphore(max(1, limit))
+            return self._semaphores[key]
+
+    @contextmanager
+    def slot(self, url):
+        """Blocks until a request slot for the host of 'url' is free, and holds it for the 'with' block."""
+        semaphore = self._semaphore(url)
+        semaphore.acquire()
+        try:
+            yield
+        finally:
+            semaphore.release()
+
+
+def parseRetryAfter(value):
+    """Returns the seconds to wait from a Retry-After header (delay in seconds or HTTP date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class TokenBucket:
+    """
+    Allows 'rate' requests per second on average, with bursts of up to 'burst' requests.
+    A bucket without a rate never delays requests except while paused.
+    """
+
+    def __init__(self, rate=None, burst=1):
+        self.rate = rate
+        self.capacity = max(1, burst)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        if now > self.updated:
+            if self.rate:
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def reserve(self):
+        """Takes a token and returns how many seconds the caller must wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            paused = max(0.0, self.updated - now)
+            if not self.rate:
+                return paused
+            self.tokens -= 1
+            return paused + max(0.0, -self.tokens) / self.rate
+
+    def pause(self, seconds):
+        """Holds back every request for 'seconds' (e.g. after a 429), then resumes at the normal rate."""
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.tokens = min(self.tokens, 0)
+            self.updated = max(self.updated, now + seconds)
+
+
+class RateLimiter:
+    """
+    Per-host request rates shared by every HTTP caller in the process, as token buckets configured
+    by NetInfo.HOST_RATE_LIMITS (requests per second, burst). Like HostLimiter, limits are matched
+    on the host or any of its parent domains. Hosts without a limit are not delayed, but still
+    honour the pauses asked for by the server through Retry-After.
+    """
+
+    def __init__(self, limits=None):
+        self.limits = dict(NetInfo.HOST_RATE_LIMITS if limits is None else limits)
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, url):
+        key, limit = budgetKey(hostOf(url), self.limits, None)
+        with self._lock:
+            if key not in self._buckets:
+                rate, burst = limit if limit else (None, 1)
+                self._buckets[key] = TokenBucket(rate, burst)
+            return self._buckets[key]
+
+    def wait(self, url):
+        """Blocks until a request to the host of 'url' fits in its budget."""
+        delay = self._bucket(url).reserve()
+        if delay > 0:
+            time.sleep(delay)
+
+    def penalize(self, url, seconds):
+        self._bucket(url).pause(seconds)
+
+
+_rate_limiter = None
+_rate_limiter_lock = threading.Lock()
+
+
+def getRateLimiter():
+    """Returns the RateLimiter shared by the whole process."""
+    global _rate_limiter
+    with _rate_limiter_lock:
+        if _rate_limiter is None:
+            _rate_limiter = RateLimiter()
+        return _rate_limiter
+
+
+class ThrottledSession(requests.Session):
+    """
+    A requests Session whose requests wait for their host's budget in the shared RateLimiter.
+    Responses with status 429 (or 503 with a Retry-After header) pause the host for every
+    caller, for as long as the server asked (or an exponential backoff), and are retried
+    up to NetInfo.RATE_LIMIT_RETRIES times.
+    """
+
+    def __init__(self, limiter=None):
+        super().__init__()
+        self.limiter = limiter or getRateLimiter()
+
+    def request(self, method, url, *args, **kwargs):
+        for attempt in range(NetInfo.RATE_LIMIT_RETRIES + 1):
+            self.limiter.wait(url)
+            response = super().request(method, url, *args, **kwargs)
+            if response.status_code not in (429, 503) or attempt == NetInfo.RATE_LIMIT_RETRIES:
+                return response
+            delay = parseRetryAfter(response.headers.get("Retry-After"))
+            if delay is None:
+                if response.status_code == 503:
+                    return response
+                delay = NetInfo.RATE_LIMIT_BACKOFF * 2 ** attempt
+            delay = min(delay, NetInfo.MAX_RETRY_AFTER)
+            print(f"    -> {hostOf(url)} is rate limiting us, waiting {delay:.0f} seconds...")
+            self.limiter.penalize(url, delay)
+            response.close()
+        return response
+
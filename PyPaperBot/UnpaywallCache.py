@@ -0,0 +1,153 @@
+# PyPaperBot/UnpaywallCache.py
+import os
+import json
+import time
+import pickle
+import threading
+from .NetInfo import NetInfo
+from .HttpClient import getHttpClient
+
+CACHE_FILE = os.path.join(os.getcwd(), 'cache', 'unpaywall_cache.jsonl')
+# Pickled caches written by unpywall's UnpywallCache (by gui.py, and by default in the working directory)
+LEGACY_CACHE_FILES = [os.path.join(os.getcwd(), 'cache', 'unpaywall_cache'), os.path.join(os.getcwd(), 'unpaywall_cache')]
+UNPAYWALL_API = "https://api.unpaywall.org/v2"
+DAY = 24 * 60 * 60
+
+
+class UnpaywallError(Exception):
+    """The Unpaywall API could not be asked (no e-mail set, or an unexpected response)."""
+
+
+def unpaywallEmail():
+    """The e-mail Unpaywall requires with each request: NetInfo.UNPAYWALL_EMAIL, or $UNPAYWALL_EMAIL (set by UnpywallCredentials)."""
+    return NetInfo.UNPAYWALL_EMAIL or os.environ.get("UNPAYWALL_EMAIL")
+
+
+def compactRecord(doi, data, timestamp=None):
+    """Keeps only the fields PyPaperBot uses from an Unpaywall API record."""
+    best = (data or {}).get("best_oa_location") or {}
+    return {
+        "doi": doi.strip().lower(),
+        "is_oa": bool((data or {}).get("is_oa")),
+        "url": best.get("url"),
+        "url_for_pdf": best.get("url_for_pdf"),
+        "timestamp": timestamp or time.time(),
+    }
+
+
+def fetchUnpaywall(doi):
+    """
+    Asks the Unpaywall API about a DOI and returns its compact record.
+    A DOI Unpaywall does not know (404) gets a record without OA location; any other failure
+    raises UnpaywallError, so it is not mistaken for a DOI without OA copy.
+    """
+    email = unpaywallEmail()
+    if not email:
+        raise UnpaywallError("Unpaywall needs an e-mail address (set UNPAYWALL_EMAIL).")
+    r = getHttpClient().get(f"{UNPAYWALL_API}/{doi}", params={"email": email})
+    if r.status_code == 404:
+        return compactRecord(doi, None)
+    if r.status_code != 200:
+        raise UnpaywallError(f"Unpaywall API returned status {r.status_code}.")
+    return compactRecord(doi, r.json())
+
+
+class UnpaywallCache:
+    """
+    DOI -> best OA location, as one JSON line per lookup (DOI, is_oa, url, url_for_pdf, timestamp).
+    The file is read once and new lookups are appended, so saving costs one line; it is rewritten
+    only when superseded lines outnumber the live ones. Entries expire after
+    NetInfo.UNPAYWALL_CACHE_TTL_DAYS. If the file does not exist yet, the pickled unpywall cache
+    is migrated into it.
+    """
+
+    def __init__(self, cache_file=None, legacy_files=None):
+        self.cache_file = cache_file or CACHE_FILE
+        self._lock = threading.Lock()
+        self.entries = {}
+        if not os.path.exists(self.cache_file):
+            for legacy_file in (legacy_files if legacy_files is not None else LEGACY_CACHE_FILES):
+                if os.path.exists(legacy_file):
+                    self.migrate(legacy_file)
+                    break
+        self._load()
+
+    def _load(self):
+        lines = 0
+        if os.path.exists(self.cache_file):
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        self.entries[entry["doi"]] = entry
+                        lines += 1
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        continue
+        if lines > 2 * len(self.entries) + 100:
+            self._rewrite()
+
+    def _rewrite(self):
+        tmp_name = self.cache_file + ".tmp"
+        with open(tmp_name, 'w', encoding='utf-8') as f:
+            for entry in self.entries.values():
+                f.write(json.dumps(entry) + "\n")
+        os.replace(tmp_name, self.cache_file)
+
+    def _append(self, entries):
+        os.makedirs(os.path.dirname(self.cache_file) or ".", exist_ok=True)
+        with open(self.cache_file, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+
+    def migrate(self, legacy_file):
+        """Converts a pickled UnpywallCache (whole requests.Response objects) into compact records."""
+        print(f"Migrating the Unpaywall cache {legacy_file} to {self.cache_file}...")
+        try:
+            with open(legacy_file, 'rb') as f:
+                legacy = pickle.load(f)
+        except Exception as e:
+            print(f"    Warning: Could not read the old Unpaywall cache. Reason: {e}")
+            return
+        records = []
+        for doi, response in legacy.get('content', {}).items():
+            try:
+                data = response.json()
+            except Exception:
+                continue
+            records.append(compactRecord(doi, data, legacy.get('access_times', {}).get(doi)))
+        with self._lock:
+            self._append(records)
+        print(f"    {len(records)} DOIs migrated.")
+
+    def get(self, doi, force=False):
+        """Returns the DOI's record from the cache, or from the API (and caches it). Raises UnpaywallError if the API failed."""
+        key = doi.strip().lower()
+        with self._lock:
+            entry = self.entries.get(key)
+        if entry is not None and not force and time.time() - entry["timestamp"] < NetInfo.UNPAYWALL_CACHE_TTL_DAYS * DAY:
+            return entry
+        entry = fetchUnpaywall(doi)
+        with self._lock:
+            self.entries[key] = entry
+            self._append([entry])
+        return entry
+
+    def getDocLink(self, doi):
+        """
+        The URL of the best OA location (not necessarily a PDF), like Unpywall.get_doc_link.
+        None means the DOI has no OA copy; failures raise UnpaywallError.
+        """
+        return self.get(doi)["url"]
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def getUnpaywallCache(cache_file=None):
+    """Returns the Unpaywall cache shared by the process, opening it at 'cache_file' the first time."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = UnpaywallCache(cache_file)
+        return _cache
@@ -0,0 +1,108 @@
+# PyPaperBot/UnpaywallSnapshot.py
+import os
+import gzip
+import json
+import sqlite3
+import threading
+from .NetInfo import NetInfo
+
+DEFAULT_DB = os.path.join(os.getcwd(), 'cache', 'unpaywall_snapshot.sqlite')
+
+
+def snapshotPath():
+    return NetInfo.UNPAYWALL_SNAPSHOT_DB or DEFAULT_DB
+
+
+def _records(file_path):
+    opener = gzip.open if file_path.endswith(".gz") else open
+    with opener(file_path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def ingestSnapshot(file_paths, db_path=None, oa_only=False, batch_size=50000):
+    """
+    Builds (or extends) the local index from Unpaywall snapshot files (JSONL, optionally gzipped).
+    Only the DOI and its best OA location are kept. With oa_only, closed-access records are skipped;
+    otherwise they are kept too, so those DOIs are known to have no OA copy without asking the API.
+    Returns the number of records indexed.
+    """
+    db_path = db_path or snapshotPath()
+    os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    # The index can always be rebuilt from the snapshot, so durability is traded for ingest speed
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("CREATE TABLE IF NOT EXISTS oa (doi TEXT PRIMARY KEY, is_oa INTEGER, url TEXT, url_for_pdf TEXT) WITHOUT ROWID")
+    total = 0
+    rows = []
+    try:
+        for file_path in file_paths:
+            print(f"Indexing Unpaywall snapshot {file_path}...")
+            for record in _records(file_path):
+                doi = (record.get("doi") or "").strip().lower()
+                if not doi or (oa_only and not record.get("is_oa")):
+                    continue
+                best = record.get("best_oa_location") or {}
+                rows.append((doi, 1 if record.get("is_oa") else 0, best.get("url"), best.get("url_for_pdf")))
+                if len(rows) >= batch_size:
+                    conn.executemany("INSERT OR REPLACE INTO oa VALUES (?, ?, ?, ?)", rows)
+                    conn.commit()
+                    total += len(rows)
+                    rows = []
+                    print(f"    {total} records indexed...")
+        if rows:
+            conn.executemany("INSERT OR REPLACE INTO oa VALUES (?, ?, ?, ?)", rows)
+            conn.commit()
+            total += len(rows)
+    finally:
+        conn.close()
+    print(f"Indexed {total} records into {db_path}")
+    return total
+
+
+class UnpaywallSnapshot:
+    """
+    Read-only DOI -> best OA location lookups in the index built by ingestSnapshot.
+    Each thread opens its own connection.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path or snapshotPath()
+        self._local = threading.local()
+
+    @classmethod
+    def open(cls, db_path=None):
+        """Returns the snapshot index if one was ingested, else None."""
+        db_path = db_path or snapshotPath()
+        return cls(db_path) if os.path.exists(db_path) else None
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+            self._local.conn = conn
+        return conn
+
+    def lookup(self, doi):
+        """
+        Returns {'is_oa', 'url', 'url_for_pdf'} for a DOI in the snapshot, or None if the snapshot
+        does not have it (the API should then be asked).
+        """
+        if not doi:
+            return None
+        try:
+            row = self._connection().execute(
+                "SELECT is_oa, url, url_for_pdf FROM oa WHERE doi = ?", (doi.strip().lower(),)).fetchone()
+        except sqlite3.Error as e:
+            print(f"    Warning: Could not read the Unpaywall snapshot. Reason: {e}")
+            return None
+        if row is None:
+            return None
+        return {"is_oa": bool(row[0]), "url": row[1], "url_for_pdf": row[2]}
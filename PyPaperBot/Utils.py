@@ -1,2 +1,35 @@
+import os
+import json
+import tempfile
+
+
 def URLjoin(*args):
-    return "/".join(map(lambda x: str(x).rstrip('/'), args))
\ No newline at end of file
+    return "/".join(map(lambda x: str(x).rstrip('/'), args))
+
+
+def loadJson(path, default=None):
+    """Returns the JSON content of a file, or 'default' ({} if None) when it is missing or unreadable."""
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (json.JSONDecodeError, IOError):
+            pass
+    return {} if default is None else default
+
+
+def saveJson(path, data, indent=4):
+    """
+    Writes 'data' as JSON to a temporary file next to 'path', then moves it over 'path',
+    so readers (and runs interrupted while saving) never see a partly written file.
+    """
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=folder)
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=indent)
+        os.replace(tmp_name, path)
+    except BaseException:
+        os.remove(tmp_name)
+        raise
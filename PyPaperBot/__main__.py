@@ -4,20 +4,22 @@ import argparse
 import sys
 import os
 import time
-import requests
 from .Paper import Paper
-from .PapersFilters import filterJurnals, filter_min_date, similarStrings
+from .PapersFilters import similarStrings, selectPapers
 from .Downloader import downloadPapers
 from .Scholar import ScholarPapersInfo
-from .Crossref import getPapersInfoFromDOIs
+from .Crossref import getPapersInfoFromDOIList
+from .UnpaywallSnapshot import ingestSnapshot
 from .proxy import proxy
+from .NetInfo import NetInfo
+from .HttpClient import getHttpClient
 from .__init__ import __version__
 from urllib.parse import urljoin
 
 def checkVersion():
     try :
         print("PyPaperBot v" + __version__)
-        response = requests.get('https://pypi.org/pypi/pypaperbot/json')
+        response = getHttpClient().get('https://pypi.org/pypi/pypaperbot/json')
         latest_version = response.json()['info']['version']
         if latest_version != __version__:
             print("NEW VERSION AVAILABLE!\nUpdate with 'pip install PyPaperBot —upgrade' to get the latest features!\n")
@@ -27,7 +29,9 @@ def checkVersion():
 
 def start(query, scholar_results, scholar_pages, dwn_dir, proxy, min_date=None, num_limit=None, num_limit_type=None,
           filter_jurnal_file=None, restrict=None, DOIs=None, SciHub_URL=None, chrome_version=None, cites=None,
-          use_doi_as_filename=False, SciDB_URL=None, skip_words=None):
+          use_doi_as_filename=False, SciDB_URL=None, skip_words=None, workers=1,
+          download_strategy="waterfall", adaptive_order=True, ignore_negative_cache=False, use_library=True,
+          concurrency=1):
 
     if SciDB_URL is not None and "/scidb" not in SciDB_URL:
         SciDB_URL = urljoin(SciDB_URL, "/scidb/")
@@ -36,35 +40,18 @@ def start(query, scholar_results, scholar_pages, dwn_dir, proxy, min_date=None,
     if DOIs is None:
         print("Query: {}".format(query))
         print("Cites: {}".format(cites))
-        to_download = ScholarPapersInfo(query, scholar_pages, restrict, min_date, scholar_results, chrome_version, cites, skip_words)
+        to_download = ScholarPapersInfo(query, scholar_pages, restrict, min_date, scholar_results, chrome_version, cites, skip_words,
+                                        workers=concurrency)
     else:
         print("Downloading papers from DOIs\n")
-        num = 1
-        i = 0
-        while i < len(DOIs):
-            DOI = DOIs[i]
-            print("Searching paper {} of {} with DOI {}".format(num, len(DOIs), DOI))
-            papersInfo = getPapersInfoFromDOIs(DOI, restrict)
-            papersInfo.use_doi_as_filename = use_doi_as_filename
-            to_download.append(papersInfo)
-
-            num += 1
-            i += 1
+        to_download = getPapersInfoFromDOIList(DOIs, restrict, use_doi_as_filename, concurrency)
 
     if restrict != 0 and to_download:
-        if filter_jurnal_file is not None:
-            to_download = filterJurnals(to_download, filter_jurnal_file)
+        to_download = selectPapers(to_download, filter_jurnal_file, min_date, num_limit_type)
 
-        if min_date is not None:
-            to_download = filter_min_date(to_download, min_date)
-
-        if num_limit_type is not None and num_limit_type == 0:
-            to_download.sort(key=lambda x: int(x.year) if x.year is not None else 0, reverse=True)
-
-        if num_limit_type is not None and num_limit_type == 1:
-            to_download.sort(key=lambda x: int(x.cites_num) if x.cites_num is not None else 0, reverse=True)
-
-        downloadPapers(to_download, dwn_dir, num_limit, SciHub_URL, SciDB_URL)
+        downloadPapers(to_download, dwn_dir, num_limit, SciHub_URL, SciDB_URL, workers=workers,
+                       strategy=download_strategy, adaptive_order=adaptive_order,
+                       ignore_negative_cache=ignore_negative_cache, use_library=use_library)
 
     Paper.generateReport(to_download, dwn_dir + "result.csv")
     Paper.generateBibtex(to_download, dwn_dir + "bibtex.bib")
@@ -116,8 +103,37 @@ def main():
                         help='First three digits of the chrome version installed on your machine. If provided, selenium will be used for scholar search. It helps avoid bot detection but chrome must be installed.')
     parser.add_argument('--use-doi-as-filename', action='store_true', default=False,
                         help='Use DOIs as output file names')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of papers to download at the same time (default 1, or --async-concurrency with --async). Requests to the same host are still capped')
+    parser.add_argument('--download-strategy', default='waterfall', choices=['waterfall', 'race'],
+                        help='waterfall: try the download sources one after another (default). '
+                             'race: query Unpaywall, doi.org, arXiv and Anna\'s Archive at the same time and keep the first PDF')
+    parser.add_argument('--fixed-source-order', action='store_true', default=False,
+                        help='Always try the download sources in the default order instead of ordering them by past success for each publisher')
+    parser.add_argument('--ignore-negative-cache', action='store_true', default=False,
+                        help='Also try the sources that found nothing for a paper on a recent run')
+    parser.add_argument('--max-pdf-size', type=int, default=None,
+                        help='Maximum size in MB of a downloaded PDF (default 200). Larger downloads are aborted')
+    parser.add_argument('--library-dir', type=str, default=None,
+                        help='Directory of the PDF library shared by all runs (default ./cache/library). Papers already in it are not downloaded again')
+    parser.add_argument('--no-library', action='store_true', default=False,
+                        help='Do not use the PDF library: always download and keep independent copies')
+    parser.add_argument('--unpaywall-snapshot', type=str, default=None,
+                        help='SQLite index of an Unpaywall snapshot (default ./cache/unpaywall_snapshot.sqlite). DOIs it contains are resolved without the Unpaywall API')
+    parser.add_argument('--ingest-unpaywall', nargs='+', default=None, metavar='SNAPSHOT',
+                        help='Index Unpaywall snapshot files (.jsonl or .jsonl.gz) into the --unpaywall-snapshot database, then exit')
+    parser.add_argument('--async', dest='use_async', action='store_true', default=False,
+                        help='Fetch the Scholar pages, Crossref DOI batches and downloads concurrently')
+    parser.add_argument('--async-concurrency', type=int, default=None,
+                        help='Number of network calls each --async phase runs at the same time (default 64)')
     args = parser.parse_args()
 
+    if args.unpaywall_snapshot is not None:
+        NetInfo.UNPAYWALL_SNAPSHOT_DB = args.unpaywall_snapshot
+    if args.ingest_unpaywall:
+        ingestSnapshot(args.ingest_unpaywall)
+        return
+
     if args.single_proxy is not None:
         os.environ['http_proxy'] = args.single_proxy
         os.environ['HTTP_PROXY'] = args.single_proxy
@@ -151,6 +167,15 @@ def main():
     if not os.path.exists(dwn_dir):
         os.makedirs(dwn_dir, exist_ok=True)
 
+    if args.workers is not None and args.workers < 1:
+        print("Error: --workers must be at least 1")
+        sys.exit()
+
+    if args.max_pdf_size is not None:
+        NetInfo.MAX_PDF_SIZE = args.max_pdf_size * 1024 * 1024
+    if args.library_dir is not None:
+        NetInfo.PDF_LIBRARY_DIR = args.library_dir
+
     if args.max_dwn_year is not None and args.max_dwn_cites is not None:
         print("Error: Only one option between '--max-dwn-year' and '--max-dwn-cites' can be used ")
         sys.exit()
@@ -199,10 +224,13 @@ def main():
         max_dwn = args.max_dwn_cites
         max_dwn_type = 1
 
+    concurrency = (args.async_concurrency or NetInfo.ASYNC_CONCURRENCY) if args.use_async else 1
 
     start(args.query, args.scholar_results, scholar_pages, dwn_dir, proxy, args.min_year , max_dwn, max_dwn_type ,
           args.journal_filter, args.restrict, DOIs, args.scihub_mirror, args.selenium_chrome_version, args.cites,
-          args.use_doi_as_filename, args.annas_archive_mirror, args.skip_words)
+          args.use_doi_as_filename, args.annas_archive_mirror, args.skip_words, args.workers or concurrency,
+          args.download_strategy, not args.fixed_source_order, args.ignore_negative_cache,
+          not args.no_library, concurrency)
 
 if __name__ == "__main__":
     checkVersion()
@@ -10,9 +10,8 @@ from pathlib import Path
 
 from PyPaperBot.__main__ import start as standard_search_start
 from PyPaperBot.RelevanceSearch import find_relevant_papers
-from unpywall import Unpywall
 from unpywall.utils import UnpywallCredentials
-from unpywall.cache import UnpywallCache
+from PyPaperBot.UnpaywallCache import getUnpaywallCache
 
 CONFIG_FILE = 'config.json'
 
@@ -95,6 +94,10 @@ class App:
         self.num_non_reviews_entry.insert(0, "6")
         self.num_non_reviews_entry.pack(side='left', padx=5)
 
+        self.use_async = tk.BooleanVar(value=False)
+        tk.Checkbutton(self.relevant_frame, text="Run searches, lookups and downloads concurrently",
+                       variable=self.use_async).pack(anchor='w', pady=5)
+
         self.search_button = tk.Button(root, text="Search", command=self.start_search_thread, font=('Helvetica', 10, 'bold'))
         self.search_button.pack(pady=10)
 
@@ -151,7 +154,8 @@ class App:
                     num_reviews=int(self.num_reviews_entry.get()),
                     num_non_reviews=int(self.num_non_reviews_entry.get()),
                     s2_api_key=s2_api_key,
-                    gemini_api_key=gemini_api_key
+                    gemini_api_key=gemini_api_key,
+                    use_async=self.use_async.get()
                 )
             messagebox.showinfo('Done!', 'Process finished.')
         except Exception as e:
@@ -181,8 +185,8 @@ def initialize_credentials():
     
     # FIX: The Unpaywall cache is re-enabled. Disabling it causes services
     # to block our IP address for making too many requests (403 Forbidden).
-    cache = UnpywallCache(os.path.join(cache_dir, 'unpaywall_cache'))
-    Unpywall.init_cache(cache)
+    # The compact cache migrates the old pickled one (cache/unpaywall_cache) the first time
+    getUnpaywallCache(os.path.join(cache_dir, 'unpaywall_cache.jsonl'))
     return True
 
 if __name__ == '__main__':
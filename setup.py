@@ -45,6 +45,10 @@ setuptools.setup(
         'urllib3>=1.25.10',
         'wrapt>=1.12.1',
       ],
+  extras_require={
+        'http2': ['httpx[http2]'],
+        'fuzzy': ['rapidfuzz'],
+      },
   classifiers=[
     'Development Status :: 4 - Beta',
     'Intended Audience :: Science/Research',